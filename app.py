@@ -1,4 +1,4 @@
-from flask import Flask, render_template, redirect, url_for
+from flask import Flask, Response, abort, render_template, redirect, request, url_for
 from config import Config
 from extensions import db, login_manager, mail
 
@@ -13,9 +13,13 @@ login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Please log in to access this page.'
 mail.init_app(app)
 
+# SQLite pragmas on every new connection (pool sizing comes from SQLALCHEMY_ENGINE_OPTIONS)
+from utils.database import init_engines
+init_engines(app)
+
 # Import models (will be created later)
 # This import must come after db initialization
-from models import admin, doctor, patient, department, appointment, treatment
+from models import admin, doctor, patient, department, appointment, treatment, user_identity, outbox, import_job, doctor_schedule
 
 # Import routes
 from routes import auth, admin as admin_routes, doctor as doctor_routes, patient as patient_routes
@@ -26,24 +30,23 @@ app.register_blueprint(admin_routes.bp)
 app.register_blueprint(doctor_routes.bp)
 app.register_blueprint(patient_routes.bp)
 
+# Per-request SQL profiling, only hooked in when SQL_PROFILING is enabled
+from utils.profiling import init_profiling
+init_profiling(app)
+
+# Request, login, booking, hashing and connection pool metrics
+from utils.metrics import init_metrics, REGISTRY, CONTENT_TYPE
+init_metrics(app)
+
 # User loader for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
     """Load user by ID for Flask-Login"""
-    # Try to load from each user type
-    from models.admin import Admin
-    from models.doctor import Doctor
-    from models.patient import Patient
+    from utils.identity import load_identity
 
-    # Check which type of user it is based on ID format
     # Format: <type>_<id> (e.g., "admin_1", "doctor_5", "patient_10")
-    if user_id.startswith('admin_'):
-        return Admin.query.get(int(user_id.split('_')[1]))
-    elif user_id.startswith('doctor_'):
-        return Doctor.query.get(int(user_id.split('_')[1]))
-    elif user_id.startswith('patient_'):
-        return Patient.query.get(int(user_id.split('_')[1]))
-    return None
+    # Served from the identity cache; the ORM object is only loaded when needed
+    return load_identity(user_id)
 
 # Home route
 @app.route('/')
@@ -51,6 +54,14 @@ def index():
     """Home page - redirect to login"""
     return redirect(url_for('auth.login'))
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint, guarded by METRICS_TOKEN when set"""
+    token = app.config['METRICS_TOKEN']
+    if not app.config['METRICS_ENABLED'] or (token and request.headers.get('Authorization') != f'Bearer {token}'):
+        abort(404)
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -61,5 +72,24 @@ def internal_error(error):
     db.session.rollback()
     return render_template('500.html'), 500
 
+def start_server_threads():
+    """
+    Start the background work of a serving process
+    Only the server entry points call this (python app.py below, gunicorn's
+    post_fork hook in gunicorn.conf.py), never an import, so CLI scripts that
+    import the app do not deliver outbox mail or fork hashing workers.
+    """
+    from utils.mailer import init_mail_worker
+    from utils.passwords import init_password_pool
+
+    # Fork the hashing workers while this process is still single-threaded
+    init_password_pool(app)
+    init_mail_worker(app)
+
 if __name__ == '__main__':
+    import os
+
+    # The reloader's parent process only watches files, the child serves
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_server_threads()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,146 @@
+"""
+Admin analytics benchmark
+Generates a synthetic appointment table inside SQLite (a recursive CTE, so
+10M rows load in minutes), then times the analytics report: one GROUP BY
+pass over appointments folded in Python. For comparison it times the
+straightforward approach, a Python loop over ORM Appointment objects, on the
+first --baseline-rows rows and extrapolates it to the whole table; loading
+10M ORM objects outright would need tens of GB of memory.
+
+Usage:
+    python benchmarks/analytics.py                       # 10M appointments
+    python benchmarks/analytics.py --appointments 1000000 --doctors 200
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time as timer
+from collections import Counter
+from datetime import date, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SLOTS_PER_DAY = 8
+
+APPOINTMENTS = """
+WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < :count - 1)
+INSERT INTO appointments (patient_id, doctor_id, date, time, status, created_at, updated_at)
+SELECT i % :patients + 1, i % :doctors + 1, day, printf('%02d:00:00.000000', 9 + (i / :doctors) % 8),
+       CASE WHEN day < :today THEN
+                CASE WHEN h < 8 THEN 'Cancelled' WHEN h < 12 THEN 'Booked' ELSE 'Completed' END
+            ELSE CASE WHEN h < 10 THEN 'Cancelled' ELSE 'Booked' END END,
+       day || ' 08:00:00.000000', day || ' 08:00:00.000000'
+FROM (SELECT i, date(:first_day, '+' || (i / :doctors / 8) || ' days') AS day, (i * 2654435761) % 100 AS h FROM n)
+"""
+
+def rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def timed(f, repeat=1):
+    start = timer.perf_counter()
+    for _ in range(repeat):
+        result = f()
+    return (timer.perf_counter() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--appointments', type=int, default=10_000_000)
+    parser.add_argument('--doctors', type=int, default=500)
+    parser.add_argument('--patients', type=int, default=100_000)
+    parser.add_argument('--departments', type=int, default=12)
+    parser.add_argument('--baseline-rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='hms-bench-')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'analytics.db')
+    os.environ['MAIL_WORKER_IN_PROCESS'] = 'False'
+
+    from sqlalchemy import text
+    from app import app
+    from extensions import db
+    from models import Appointment, Department, Doctor, DoctorAvailability
+    from utils.analytics import build_report, week_start
+
+    today = date.today()
+    days = -(-args.appointments // (args.doctors * SLOTS_PER_DAY))
+    first_day = today - timedelta(days=days - 30)
+
+    with app.app_context():
+        db.create_all()
+        print(f'Generating {args.appointments:,} appointments over {days:,} days '
+              f'for {args.doctors} doctors...')
+        started = timer.perf_counter()
+        db.session.execute(db.insert(Department), [
+            {'department_name': f'Department {n}'} for n in range(1, args.departments + 1)
+        ])
+        db.session.execute(db.insert(Doctor), [
+            {'name': f'Dr. Bench {n}', 'email': f'doctor{n}@bench.test', 'password_hash': 'x',
+             'specialization_id': n % args.departments + 1} for n in range(1, args.doctors + 1)
+        ])
+        db.session.execute(db.insert(DoctorAvailability), [
+            {'doctor_id': n, 'day_of_week': day, 'start_time': time(9),
+             'end_time': time(17)}
+            for n in range(1, args.doctors + 1)
+            for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')
+        ])
+        db.session.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+            "INSERT INTO patients (name, email, password_hash) SELECT 'Patient ' || i, 'p' || i || '@bench.test', 'x' FROM n"
+        ), {'count': args.patients})
+
+        # Load without indexes, then build them once
+        indexes = list(Appointment.__table__.indexes)
+        for index in indexes:
+            db.session.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+        db.session.execute(text(APPOINTMENTS), {
+            'count': args.appointments, 'patients': args.patients, 'doctors': args.doctors,
+            'first_day': first_day.isoformat(), 'today': today.isoformat(),
+        })
+        db.session.commit()
+        for index in indexes:
+            index.create(db.engine)
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        print(f'  loaded in {timer.perf_counter() - started:.0f}s, '
+              f'{os.path.getsize(os.path.join(workdir, "analytics.db")) / 2**20:,.0f} MiB on disk\n')
+
+        ranges = [
+            ('last 12 weeks', week_start(today) - timedelta(weeks=11), today),
+            ('last 104 weeks', today - timedelta(weeks=104) + timedelta(days=1), today),
+            ('whole table', first_day, today + timedelta(days=30)),
+        ]
+        print(f"{'range':<16}{'appointments':>14}{'report (s)':>12}{'rows/s':>14}")
+        for label, start, end in ranges:
+            seconds, report = timed(lambda: build_report(start, end, today), args.repeat)
+            total = sum(week['appointments'] for week in report['weekly'])
+            print(f'{label:<16}{total:>14,}{seconds:>12.2f}{total / seconds:>14,.0f}')
+        print(f'Peak RSS after reports: {rss_mib():.0f} MiB\n')
+
+        # Baseline: the same department/week, cancellation and no-show counts from ORM objects
+        def orm_loop():
+            department, cancelled, no_shows = Counter(), Counter(), Counter()
+            query = Appointment.query.order_by(Appointment.id).limit(args.baseline_rows)
+            for appointment in query.yield_per(10_000):
+                doctor = appointment.doctor
+                department[(doctor.specialization_id, week_start(appointment.date))] += 1
+                if appointment.status == 'Cancelled':
+                    cancelled[doctor.id] += 1
+                elif appointment.status == 'Booked' and appointment.date < today:
+                    no_shows[week_start(appointment.date)] += 1
+            return department
+
+        seconds, _ = timed(orm_loop)
+        db.session.remove()
+        rate = args.baseline_rows / seconds
+        engine_seconds, _ = timed(lambda: build_report(first_day, today + timedelta(days=30), today))
+        print(f'ORM loop over {args.baseline_rows:,} rows: {seconds:.2f}s ({rate:,.0f} rows/s), '
+              f'extrapolated to {args.appointments:,}: {args.appointments / rate:,.0f}s')
+        print(f'Aggregate pass over {args.appointments:,} rows: {engine_seconds:.2f}s '
+              f'({args.appointments / rate / engine_seconds:.0f}x faster)')
+        print(f'Peak RSS: {rss_mib():.0f} MiB')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Concurrent booking stress test
+Fires many simultaneous bookings for the same doctor slot through the
+booking route and asserts that exactly one of them wins and none errors.
+
+Usage:
+    python benchmarks/booking_stress.py --threads 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time as timer
+from collections import Counter
+from datetime import date, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='hms-bench-')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'stress.db')
+
+    from app import app
+    from extensions import db
+    from models import Appointment, Department, Doctor, DoctorAvailability, Patient
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Department), [{'department_name': 'General'}])
+        db.session.execute(db.insert(Doctor), [
+            {'name': 'Doctor', 'email': 'doctor@bench.local', 'password_hash': 'x', 'specialization_id': 1}
+        ])
+        db.session.execute(db.insert(Patient), [
+            {'name': f'Patient {i}', 'email': f'patient{i}@bench.local', 'password_hash': 'x'}
+            for i in range(args.threads)
+        ])
+        db.session.execute(db.insert(DoctorAvailability), [
+            {'doctor_id': 1, 'day_of_week': day, 'start_time': time(9, 0), 'end_time': time(17, 0)}
+            for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        ])
+        db.session.commit()
+
+    slot_date = (date.today() + timedelta(days=1)).isoformat()
+    barrier = threading.Barrier(args.threads)
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def book(patient_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = f'patient_{patient_id}'
+            session['_fresh'] = True
+        barrier.wait()
+        response = client.post('/patient/appointments/book/1', data={'date': slot_date, 'time': '10:00'})
+        if response.status_code != 302:
+            outcome = f'HTTP {response.status_code}'
+        elif response.headers['Location'].endswith('/patient/appointments'):
+            outcome = 'booked'
+        else:
+            outcome = 'rejected'
+        with lock:
+            outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=book, args=(i + 1,)) for i in range(args.threads)]
+    start = timer.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = timer.perf_counter() - start
+
+    with app.app_context():
+        active = Appointment.query.filter(Appointment.status != 'Cancelled').count()
+
+    print(f"{args.threads} concurrent bookings in {elapsed:.2f}s: {dict(outcomes)}")
+    print(f"Active appointments in the slot: {active}")
+
+    assert active == 1, f'expected exactly one booking, found {active}'
+    assert outcomes['booked'] == 1, f'expected exactly one winner, got {outcomes["booked"]}'
+    assert outcomes['booked'] + outcomes['rejected'] == args.threads, f'unexpected responses: {dict(outcomes)}'
+    print("[SUCCESS] Exactly one booking won the slot")
+
+if __name__ == '__main__':
+    main()
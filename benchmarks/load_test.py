@@ -0,0 +1,292 @@
+"""
+Route load test
+Seeds a throwaway SQLite database with seed_data.py, then drives every route
+in routes/auth.py, routes/admin.py, routes/doctor.py and routes/patient.py
+through the Flask test client. Reports p50/p95/p99 latency and queries per
+request for each route, plus the peak memory allocated while serving one
+request (measured in a separate pass so tracing does not skew the timings).
+Each route gets --requests measured requests scaled by its weight, so heavy
+routes such as full-table exports run fewer times. Response bodies are read
+inside the timing, so streamed pages and exports are measured in full.
+
+Usage:
+    python benchmarks/load_test.py --patients 20000 --appointments 200000 --requests 50
+    python benchmarks/load_test.py --only patient.
+"""
+import argparse
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time as timer
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'password123'
+
+class Scenario:
+    """One route: role of the client, method, URL and form data per iteration"""
+
+    def __init__(self, name, role, url, method='GET', data=None, repeatable=True, fresh_client=False, weight=1.0):
+        self.name = name
+        self.role = role
+        self.url = url
+        self.method = method
+        self.data = data
+        # Safe to run extra times for warm-up and the memory pass
+        self.repeatable = repeatable
+        # Needs a new session per request, e.g. logging in or out
+        self.fresh_client = fresh_client
+        # Share of --requests this route gets
+        self.weight = weight
+
+    def request(self, client, i):
+        url = self.url(i) if callable(self.url) else self.url
+        data = self.data(i) if callable(self.data) else self.data
+        response = client.open(url, method=self.method, data=data)
+        # Streamed responses do their work while the body is read
+        response.get_data()
+        response.close()
+        return response
+
+def percentile(samples, p):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[p - 1]
+
+def free_slot_list(doctor_id, days=60):
+    """A doctor's free (date, time) slots from tomorrow on"""
+    from utils.slots import free_slots
+    start = date.today() + timedelta(days=1)
+    slots = free_slots(doctor_id, start, start + timedelta(days=days))
+    return [(day, slot) for day in sorted(slots) for slot in slots[day]]
+
+def pick_targets(db, models):
+    """The busiest active doctor and patient, and ids the mutating routes work through"""
+    Doctor, Patient, Appointment, Department = models
+
+    def busiest(column, model):
+        return db.session.query(column).join(model).filter(
+            model.is_blacklisted.is_(False)
+        ).group_by(column).order_by(db.func.count().desc()).limit(1).scalar()
+
+    doctor_id = busiest(Appointment.doctor_id, Doctor)
+    patient_id = busiest(Appointment.patient_id, Patient)
+    today = date.today()
+
+    def appointment_ids(*criteria):
+        return [row.id for row in db.session.query(Appointment.id).filter(*criteria).order_by(Appointment.id)]
+
+    return {
+        'doctor_id': doctor_id,
+        'patient_id': patient_id,
+        'other_patient_id': db.session.query(Appointment.patient_id).filter(
+            Appointment.doctor_id == doctor_id).limit(1).scalar(),
+        'appointment_id': appointment_ids(Appointment.doctor_id == doctor_id)[0],
+        'department_id': db.session.query(Doctor.specialization_id).filter(Doctor.id == doctor_id).scalar(),
+        'future_booked': appointment_ids(Appointment.doctor_id == doctor_id, Appointment.date > today,
+                                         Appointment.status == 'Booked'),
+        'past_booked': appointment_ids(Appointment.doctor_id == doctor_id, Appointment.date < today,
+                                       Appointment.status == 'Booked'),
+        'free_slots': free_slot_list(doctor_id),
+        'doctor_email': db.session.query(Doctor.email).filter(Doctor.id == doctor_id).scalar(),
+        'patient_email': db.session.query(Patient.email).filter(Patient.id == patient_id).scalar(),
+    }
+
+def build_scenarios(t, run):
+    """Every blueprint route, ordered so that routes consuming ids run after the routes creating them"""
+    def cycle(ids):
+        return lambda i: ids[i % len(ids)] if ids else 0
+
+    future, past = cycle(t['future_booked']), cycle(t['past_booked'])
+    slot = cycle(t['free_slots'])
+    doctor, patient, appointment = t['doctor_id'], t['patient_id'], t['appointment_id']
+    created = t.setdefault('created', {'doctors': [], 'appointments': []})
+    created_doctor, created_appointment = cycle(created['doctors']), cycle(created['appointments'])
+    doctor_form = {'name': 'Dr. Load Test', 'email': t['doctor_email'], 'specialization_id': t['department_id'],
+                   'contact': '555-0000'}
+    month_ago = (date.today() - timedelta(days=30)).isoformat()
+    two_years_ago = (date.today() - timedelta(weeks=104)).isoformat()
+    week = {f'{day}_{field}': value for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+            for field, value in [('available', 'on'), ('start', '09:00'), ('end', '17:00')]}
+
+    return [
+        # Auth
+        Scenario('auth.login GET', None, '/auth/login'),
+        Scenario('auth.login POST', None, '/auth/login', 'POST', {'email': t['patient_email'], 'password': PASSWORD},
+                 fresh_client=True),
+        Scenario('auth.register GET', None, '/auth/register'),
+        Scenario('auth.register POST', None, '/auth/register', 'POST', lambda i: {
+            'name': f'Load Test {i}', 'email': f'register{i}.{run}@load.local', 'password': PASSWORD,
+            'confirm_password': PASSWORD, 'contact': '555-0000', 'date_of_birth': '1990-01-01'},
+                 repeatable=False, fresh_client=True),
+        Scenario('auth.logout', 'patient', '/auth/logout', fresh_client=True),
+
+        # Admin
+        Scenario('admin.dashboard', 'admin', '/admin/dashboard'),
+        Scenario('admin.doctors', 'admin', '/admin/doctors'),
+        Scenario('admin.add_doctor GET', 'admin', '/admin/doctors/add'),
+        Scenario('admin.add_doctor POST', 'admin', '/admin/doctors/add', 'POST', lambda i: {
+            'name': f'Dr. Load {i}', 'email': f'doctor{i}.{run}@load.local',
+            'specialization_id': t['department_id'], 'contact': '555-0000'}, repeatable=False),
+        Scenario('admin.edit_doctor GET', 'admin', f'/admin/doctors/edit/{doctor}'),
+        Scenario('admin.edit_doctor POST', 'admin', f'/admin/doctors/edit/{doctor}', 'POST', doctor_form),
+        Scenario('admin.toggle_blacklist_doctor', 'admin', lambda i: f'/admin/doctors/toggle-blacklist/{created_doctor(i)}'),
+        Scenario('admin.delete_doctor', 'admin', lambda i: f'/admin/doctors/delete/{created_doctor(i)}',
+                 repeatable=False),
+        Scenario('admin.patients', 'admin', '/admin/patients'),
+        Scenario('admin.edit_patient GET', 'admin', f'/admin/patients/edit/{patient}'),
+        Scenario('admin.edit_patient POST', 'admin', f'/admin/patients/edit/{t["other_patient_id"]}', 'POST',
+                 lambda i: {'name': f'Load Patient {i}', 'email': f'patient.{run}@load.local', 'contact': '555-0000'}),
+        Scenario('admin.toggle_blacklist_patient', 'admin', f'/admin/patients/toggle-blacklist/{t["other_patient_id"]}'),
+        Scenario('admin.appointments', 'admin', '/admin/appointments'),
+        Scenario('admin.appointments ?status', 'admin', '/admin/appointments?status=Booked'),
+        Scenario('admin.search GET', 'admin', '/admin/search'),
+        Scenario('admin.search POST', 'admin', '/admin/search', 'POST', {'search_type': 'patient', 'query': 'smith'}),
+        Scenario('admin.search POST doctor', 'admin', '/admin/search', 'POST', {'search_type': 'doctor', 'query': 'cardio'}),
+        Scenario('admin.search_suggest', 'admin', '/admin/search/suggest?type=doctor&q=dr. m'),
+        Scenario('admin.search_suggest patient', 'admin', '/admin/search/suggest?type=patient&q=ma'),
+        Scenario('admin.export_appointments csv', 'admin', '/admin/export/appointments.csv', weight=0.1),
+        Scenario('admin.export_appointments ndjson', 'admin', '/admin/export/appointments.ndjson', weight=0.1),
+        Scenario('admin.export_appointments columnar', 'admin', '/admin/export/appointments.columnar', weight=0.1),
+        Scenario('admin.export_appointments csv ?start', 'admin',
+                 f'/admin/export/appointments.csv?start={month_ago}'),
+        Scenario('admin.analytics', 'admin', '/admin/analytics'),
+        Scenario('admin.analytics ?start', 'admin', f'/admin/analytics?start={two_years_ago}'),
+        Scenario('admin.profiling', 'admin', '/admin/profiling'),
+
+        # Doctor
+        Scenario('doctor.dashboard', 'doctor', '/doctor/dashboard'),
+        Scenario('doctor.appointments', 'doctor', '/doctor/appointments'),
+        Scenario('doctor.appointments ?status', 'doctor', '/doctor/appointments?status=Completed'),
+        Scenario('doctor.view_appointment', 'doctor', f'/doctor/appointments/view/{appointment}'),
+        Scenario('doctor.complete_appointment GET', 'doctor', lambda i: f'/doctor/appointments/complete/{past(i)}'),
+        Scenario('doctor.complete_appointment POST', 'doctor', lambda i: f'/doctor/appointments/complete/{past(i)}',
+                 'POST', {'diagnosis': 'Load test', 'prescription': 'Rest', 'notes': ''}, repeatable=False),
+        Scenario('doctor.cancel_appointment', 'doctor', lambda i: f'/doctor/appointments/cancel/{future(i)}',
+                 repeatable=False),
+        Scenario('doctor.patients', 'doctor', '/doctor/patients'),
+        Scenario('doctor.patient_history', 'doctor', f'/doctor/patients/history/{t["other_patient_id"]}'),
+        Scenario('doctor.manage_availability GET', 'doctor', '/doctor/availability'),
+        Scenario('doctor.manage_availability POST', 'doctor', '/doctor/availability', 'POST', week),
+
+        # Patient
+        Scenario('patient.dashboard', 'patient', '/patient/dashboard'),
+        Scenario('patient.find_doctors', 'patient', '/patient/doctors'),
+        Scenario('patient.find_doctors ?specialization', 'patient', f'/patient/doctors?specialization={t["department_id"]}'),
+        Scenario('patient.suggest_doctors', 'patient', '/patient/doctors/suggest?q=car'),
+        Scenario('patient.view_doctor', 'patient', f'/patient/doctors/{doctor}'),
+        Scenario('patient.doctor_slots', 'patient', f'/patient/doctors/{doctor}/slots?days=7'),
+        Scenario('patient.earliest_slots', 'patient', f'/patient/doctors/earliest?department={t["department_id"]}&n=5'),
+        Scenario('patient.appointments', 'patient', '/patient/appointments'),
+        Scenario('patient.book_appointment GET', 'patient', f'/patient/appointments/book/{doctor}'),
+        Scenario('patient.book_appointment POST', 'patient', f'/patient/appointments/book/{doctor}', 'POST',
+                 lambda i: {'date': slot(i)[0].isoformat(), 'time': slot(i)[1].strftime('%H:%M')}, repeatable=False),
+        Scenario('patient.cancel_appointment', 'patient', lambda i: f'/patient/appointments/cancel/{created_appointment(i)}',
+                 repeatable=False),
+        Scenario('patient.medical_history', 'patient', '/patient/history'),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--doctors', type=int, default=100)
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--appointments', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=50, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=3, help='unmeasured requests per repeatable route')
+    parser.add_argument('--only', default='', help='only routes whose name starts with this prefix')
+    parser.add_argument('--database', help='reuse an already seeded database file instead of generating one')
+    args = parser.parse_args()
+
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix='hms-bench-'), 'load.db')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.abspath(database)
+    os.environ['MAIL_WORKER_IN_PROCESS'] = 'False'
+
+    from app import app
+    from config import Config
+    from extensions import db
+    from models import Appointment, Department, Doctor, Patient
+    from seed_data import seed
+    from utils.queries import count_queries
+
+    # Routes that fail are counted in the report, keep their tracebacks out of it
+    app.logger.setLevel(logging.CRITICAL)
+
+    if not args.database:
+        from init_db import init_database
+        init_database()
+        with app.app_context():
+            start = timer.perf_counter()
+            counts = seed(doctors=args.doctors, patients=args.patients, appointments=args.appointments,
+                          password=PASSWORD, log=lambda message: None)
+            print(f"Seeded {counts} in {timer.perf_counter() - start:.1f}s")
+
+    with app.app_context():
+        targets = pick_targets(db, (Doctor, Patient, Appointment, Department))
+        admin_id = db.session.execute(db.text('SELECT id FROM admins LIMIT 1')).scalar()
+
+    run = str(int(timer.time()))
+    users = {'admin': f'admin_{admin_id}', 'doctor': f'doctor_{targets["doctor_id"]}',
+             'patient': f'patient_{targets["patient_id"]}'}
+
+    def client_for(role):
+        client = app.test_client()
+        if role:
+            with client.session_transaction() as session:
+                session['_user_id'] = users[role]
+                session['_fresh'] = True
+        return client
+
+    scenarios = [s for s in build_scenarios(targets, run) if s.name.startswith(args.only)]
+    print(f"\n{'route':<42} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'peak KiB':>9} {'errors':>7}")
+
+    for scenario in scenarios:
+        client = client_for(scenario.role)
+        for i in range(args.warmup if scenario.repeatable else 0):
+            scenario.request(client, i)
+
+        latencies, queries, errors = [], [], 0
+        for i in range(max(1, round(args.requests * scenario.weight))):
+            if scenario.fresh_client:
+                client = client_for(scenario.role)
+            with app.app_context():
+                with count_queries() as counter:
+                    start = timer.perf_counter()
+                    response = scenario.request(client, i)
+                    latencies.append((timer.perf_counter() - start) * 1000)
+            queries.append(counter.count)
+            if response.status_code >= 400:
+                errors += 1
+
+        peak = None
+        if scenario.repeatable:
+            tracemalloc.start()
+            scenario.request(client, args.requests)
+            peak = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+
+        print(f"{scenario.name:<42} {percentile(latencies, 50):8.2f} {percentile(latencies, 95):8.2f} "
+              f"{percentile(latencies, 99):8.2f} {statistics.mean(queries):8.1f} "
+              f"{peak if peak is not None else float('nan'):9.0f} {errors:>7}")
+
+        # Hand the ids created by this route to the routes that consume them
+        with app.app_context():
+            if scenario.name == 'doctor.manage_availability POST':
+                targets['free_slots'][:] = free_slot_list(targets['doctor_id'])
+            elif scenario.name == 'admin.add_doctor POST':
+                targets['created']['doctors'][:] = [row.id for row in db.session.query(Doctor.id).filter(
+                    Doctor.email.like(f'%.{run}@load.local'))]
+            elif scenario.name == 'patient.book_appointment POST':
+                targets['created']['appointments'][:] = [row.id for row in db.session.query(Appointment.id).filter(
+                    Appointment.patient_id == targets['patient_id'], Appointment.status == 'Booked',
+                    Appointment.date > date.today()).order_by(Appointment.id.desc()).limit(args.requests)]
+
+    print(f"\nPeak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB "
+          f"(password hashing: {Config.PASSWORD_HASH_METHOD})")
+
+if __name__ == '__main__':
+    main()
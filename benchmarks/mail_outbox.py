@@ -0,0 +1,79 @@
+"""
+Outbox delivery check
+Delivers through utils/smtp_sink.py, a local SMTP stand-in. Leaves messages
+queued in the outbox, then asserts that:
+  - CLI scripts that import the app (export_data.py, or a bare import) do not
+    deliver them, with MAIL_WORKER_IN_PROCESS at its default
+  - a serving process delivers them at startup, before anything new is
+    enqueued, retrying a message the SMTP server rejected
+
+Usage:
+    python benchmarks/mail_outbox.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time as timer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MESSAGES = 3
+
+def wait_for(condition, timeout=15):
+    deadline = timer.monotonic() + timeout
+    while not condition():
+        if timer.monotonic() > deadline:
+            return False
+        timer.sleep(0.1)
+    return True
+
+def main():
+    from utils.smtp_sink import SMTPSink
+
+    workdir = tempfile.mkdtemp(prefix='hms-bench-')
+    with SMTPSink() as sink:
+        os.environ.update({
+            'DATABASE_URI': 'sqlite:///' + os.path.join(workdir, 'outbox.db'),
+            'MAIL_SERVER': 'localhost', 'MAIL_PORT': str(sink.port), 'MAIL_USE_TLS': 'False',
+            'MAIL_USERNAME': 'hospital@localhost', 'MAIL_PASSWORD': '',
+            'MAIL_OUTBOX_POLL_INTERVAL': '1', 'MAIL_OUTBOX_RETRY_BASE': '1',
+        })
+        os.environ.pop('MAIL_WORKER_IN_PROCESS', None)
+
+        from app import app, start_server_threads
+        from extensions import db
+        from models.outbox import OutboxMessage
+        from utils.mailer import enqueue_mail
+
+        with app.app_context():
+            db.create_all()
+            for n in range(MESSAGES):
+                enqueue_mail(f'Queued before start {n}', [f'user{n}@example.com'], 'Hello')
+            db.session.commit()
+
+        def statuses():
+            with app.app_context():
+                return sorted(message.status for message in OutboxMessage.query.all())
+
+        # CLI runs: each imports the app and stays up long enough for a worker to poll
+        for command in ([sys.executable, 'export_data.py', '-o', os.path.join(workdir, 'export.csv')],
+                        [sys.executable, '-c', 'import time, app; time.sleep(3)']):
+            subprocess.run(command, cwd=ROOT, check=True, capture_output=True)
+        print(f'After CLI runs: {len(sink.messages)} delivered, outbox {statuses()}')
+        assert not sink.messages, 'a CLI run delivered outbox mail'
+        assert statuses() == ['Pending'] * MESSAGES
+
+        # Serving process: the worker starts with the server and drains the outbox
+        sink.fail_next = 1
+        start_server_threads()
+        delivered = wait_for(lambda: statuses() == ['Sent'] * MESSAGES)
+        print(f'After server start: {len(sink.messages)} delivered, outbox {statuses()}')
+        assert delivered, 'queued messages were not delivered after start'
+        assert len(sink.messages) == MESSAGES
+
+    print("[SUCCESS] CLI runs left the outbox alone, the server delivered it at startup")
+
+if __name__ == '__main__':
+    main()
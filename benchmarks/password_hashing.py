@@ -0,0 +1,62 @@
+"""
+Password hashing throughput benchmark
+Reports password checks (logins) per second inline on the request thread and
+through the hashing pool, for one or more hash methods.
+
+Usage:
+    python benchmarks/password_hashing.py --method scrypt:32768:8:1 --method pbkdf2:sha256:600000
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['MAIL_WORKER_IN_PROCESS'] = 'False'
+
+def run(method, workers, logins, threads):
+    from werkzeug.security import generate_password_hash, check_password_hash
+    from app import app
+    from utils import passwords
+
+    stored = generate_password_hash('correct horse', method)
+
+    start = time.perf_counter()
+    for _ in range(logins):
+        check_password_hash(stored, 'correct horse')
+    inline_rate = logins / (time.perf_counter() - start)
+
+    app.config['PASSWORD_HASH_METHOD'] = method
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    passwords.shutdown()
+    passwords.init_password_pool(app)  # start the workers outside the timing
+
+    def login(_):
+        with app.app_context():
+            return passwords.verify_password(stored, 'correct horse')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as request_threads:
+        assert all(request_threads.map(login, range(logins)))
+    pool_rate = logins / (time.perf_counter() - start)
+    passwords.shutdown()
+
+    cores = min(workers, os.cpu_count())
+    print(f"{method}")
+    print(f"  inline, 1 thread:    {inline_rate:8.1f} logins/s")
+    print(f"  pool, {workers:>2} workers:    {pool_rate:8.1f} logins/s  ({pool_rate / cores:.1f} per core)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--method', action='append')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent request threads')
+    args = parser.parse_args()
+
+    for method in args.method or ['scrypt:32768:8:1', 'pbkdf2:sha256:600000']:
+        run(method, args.workers, args.logins, args.threads)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Query count check for the appointment list pages
+Seeds a throwaway SQLite database with seed_data.py and requests
+admin.appointments, doctor.appointments and patient.appointments (a full page
+of rows each) under utils.queries.assert_max_queries. With the eager loading
+in appointment_query() every page is a single SELECT; without it each row
+lazy-loads its patient, doctor, department and treatment, so the check fails.
+
+Usage:
+    python benchmarks/query_counts.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Statements allowed per page: the appointment SELECT, plus the user's row if
+# the identity cache missed
+MAX_QUERIES = 2
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=500)
+    parser.add_argument('--appointments', type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='hms-bench-')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'queries.db')
+    os.environ['MAIL_WORKER_IN_PROCESS'] = 'False'
+
+    from contextlib import redirect_stdout
+    from app import app
+    from extensions import db
+    from init_db import init_database
+    from models import Appointment
+    from seed_data import seed
+    from utils.queries import assert_max_queries
+
+    with redirect_stdout(open(os.devnull, 'w')):
+        init_database()
+    with app.app_context():
+        seed(doctors=10, patients=args.patients, appointments=args.appointments, log=lambda *a: None)
+
+        # The doctor and patient with the most appointments, so every page is full
+        def busiest(column):
+            return db.session.execute(
+                db.select(column).group_by(column).order_by(db.func.count().desc()).limit(1)
+            ).scalar()
+        doctor_id, patient_id = busiest(Appointment.doctor_id), busiest(Appointment.patient_id)
+
+    pages = [
+        ('admin.appointments', 'admin_1', '/admin/appointments'),
+        ('doctor.appointments', f'doctor_{doctor_id}', '/doctor/appointments'),
+        ('patient.appointments', f'patient_{patient_id}', '/patient/appointments'),
+    ]
+    for name, user_id, url in pages:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = user_id
+            session['_fresh'] = True
+        client.get(url)  # warm the identity, stats and reference data caches
+
+        for query_string in ('', '?stream=1'):
+            with app.app_context(), assert_max_queries(MAX_QUERIES) as counter:
+                response = client.get(url + query_string)
+                # Read the body inside the block, streamed pages render while it is read
+                rows = response.get_data().count(b'<tr') - 1  # minus the header row
+            assert response.status_code == 200, f'{name}{query_string}: HTTP {response.status_code}'
+            assert rows > 1, f'{name}{query_string}: expected a page of appointments, got {rows}'
+            print(f'{name + query_string:<32}{rows:>4} rows{counter.count:>4} queries')
+
+    print(f"[SUCCESS] Every appointment list page ran at most {MAX_QUERIES} queries")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Query plan benchmark for the appointment/treatment indexes
+Builds a throwaway SQLite database without the indexes, times the hot queries
+and prints their plans, then applies the migrations and repeats.
+
+Usage:
+    python benchmarks/query_plans.py --appointments 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time as timer
+from datetime import date, datetime, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HOT_QUERIES = {
+    'doctor dashboard (today)': (
+        "SELECT * FROM appointments WHERE doctor_id = :doctor_id AND date = :date ORDER BY time"
+    ),
+    'booking conflict check': (
+        "SELECT id FROM appointments WHERE doctor_id = :doctor_id AND date = :date AND time = :time "
+        "AND status != 'Cancelled' LIMIT 1"
+    ),
+    'doctor pending count': (
+        "SELECT COUNT(*) FROM appointments WHERE doctor_id = :doctor_id AND status = 'Booked'"
+    ),
+    'patient appointment list': (
+        "SELECT * FROM appointments WHERE patient_id = :patient_id "
+        "ORDER BY date DESC, time DESC, id DESC LIMIT 51"
+    ),
+    'admin list by status': (
+        "SELECT * FROM appointments WHERE status = 'Booked' ORDER BY date DESC, time DESC, id DESC LIMIT 51"
+    ),
+    'recent treatments': (
+        "SELECT * FROM treatments ORDER BY created_at DESC LIMIT 5"
+    ),
+}
+
+INDEXES = [
+    'ix_appointments_doctor_date_time',
+    'ix_appointments_patient_date_time',
+    'ix_appointments_doctor_status',
+    'ix_appointments_status_date',
+    'ix_appointments_date_time_id',
+    'ix_treatments_created_at',
+    'uq_appointments_doctor_slot_active',
+]
+
+def seed(db, models, n_appointments, n_doctors, n_patients):
+    """Bulk insert a synthetic data set"""
+    Department, Doctor, Patient, Appointment, Treatment = models
+    rng = random.Random(42)
+
+    db.session.execute(db.insert(Department), [{'department_name': 'General'}])
+    db.session.execute(db.insert(Doctor), [
+        {'name': f'Doctor {i}', 'email': f'doctor{i}@bench.local', 'password_hash': 'x', 'specialization_id': 1}
+        for i in range(n_doctors)
+    ])
+    db.session.execute(db.insert(Patient), [
+        {'name': f'Patient {i}', 'email': f'patient{i}@bench.local', 'password_hash': 'x'}
+        for i in range(n_patients)
+    ])
+
+    start = date.today() - timedelta(days=365)
+    statuses = ['Booked', 'Completed', 'Completed', 'Cancelled']
+    batch = []
+    taken = set()
+    while len(taken) < n_appointments:
+        slot = (rng.randint(1, n_doctors), start + timedelta(days=rng.randint(0, 400)), time(rng.randint(8, 19), 0))
+        if slot in taken:
+            continue
+        taken.add(slot)
+        batch.append({
+            'doctor_id': slot[0],
+            'patient_id': rng.randint(1, n_patients),
+            'date': slot[1],
+            'time': slot[2],
+            'status': rng.choice(statuses),
+            'created_at': datetime.utcnow(),
+        })
+        if len(batch) == 10000:
+            db.session.execute(db.insert(Appointment), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Appointment), batch)
+
+    completed = db.session.execute(db.text("SELECT id FROM appointments WHERE status = 'Completed'")).scalars().all()
+    db.session.execute(db.insert(Treatment), [
+        {'appointment_id': apt_id, 'diagnosis': 'Routine', 'created_at': datetime.utcnow() - timedelta(minutes=apt_id)}
+        for apt_id in completed
+    ])
+    db.session.commit()
+
+def run_queries(db, params, repeat):
+    """Print the plan and mean latency of every hot query"""
+    for label, sql in HOT_QUERIES.items():
+        plan = db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql), params).all()
+        start = timer.perf_counter()
+        for _ in range(repeat):
+            db.session.execute(db.text(sql), params).all()
+        elapsed = (timer.perf_counter() - start) / repeat * 1000
+        print(f"  {label:<28} {elapsed:8.3f} ms")
+        for row in plan:
+            print(f"      {row[-1]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--appointments', type=int, default=200000)
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='hms-bench-')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from app import app
+    from extensions import db
+    from migrations import upgrade
+    from models import Department, Doctor, Patient, Appointment, Treatment
+
+    with app.app_context():
+        db.create_all()
+        for name in INDEXES:
+            db.session.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+        db.session.commit()
+
+        print(f"Seeding {args.appointments} appointments...")
+        seed(db, (Department, Doctor, Patient, Appointment, Treatment),
+             args.appointments, args.doctors, args.patients)
+
+        sample = db.session.execute(db.text('SELECT doctor_id, patient_id, date, time FROM appointments LIMIT 1')).one()
+        params = {'doctor_id': sample[0], 'patient_id': sample[1], 'date': sample[2], 'time': sample[3]}
+
+        print("\nBefore (no indexes):")
+        run_queries(db, params, args.repeat)
+
+        db.session.remove()
+        applied = upgrade(db.engine)
+        db.session.execute(db.text('ANALYZE'))
+        print(f"\nApplied migrations: {[version for version, _ in applied]}")
+
+        print("\nAfter:")
+        run_queries(db, params, args.repeat)
+
+if __name__ == '__main__':
+    main()
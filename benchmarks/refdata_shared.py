@@ -0,0 +1,81 @@
+"""
+Shared reference data cache check
+Two RefData backends stand in for two worker processes. With the local
+backend, a doctor blacklisted through one worker stays listed on the other
+until REFDATA_CACHE_TTL expires; with REFDATA_CACHE_BACKEND=redis, against
+utils/redis_local.py (or a real server via --url), the other worker drops the
+doctor on its next read.
+
+Usage:
+    python benchmarks/refdata_shared.py
+    python benchmarks/refdata_shared.py --url redis://localhost:6379/15
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def listed_after_blacklisting(refdata, make_backend):
+    """Whether a doctor blacklisted through worker A is still listed on worker B"""
+    from extensions import db
+    from models import Doctor
+
+    worker_a, worker_b = make_backend(), make_backend()
+
+    # Both workers have served the directory before the change
+    for backend in (worker_a, worker_b):
+        refdata._backend = backend
+        doctor_id = refdata.get_doctor_directory()[0]['id']
+
+    refdata._backend = worker_a
+    doctor = db.session.get(Doctor, doctor_id)
+    doctor.is_blacklisted = True
+    db.session.commit()
+    refdata.invalidate('doctors')
+
+    refdata._backend = worker_b
+    listed = any(doctor['id'] == doctor_id for doctor in refdata.get_doctor_directory())
+    doctor.is_blacklisted = False
+    db.session.commit()
+    refdata.invalidate('doctors')
+    return listed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='a Redis-compatible server to use instead of the local stand-in')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='hms-bench-')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'refdata.db')
+
+    from app import app
+    from config import Config
+    from init_db import init_database
+    from utils import refdata
+    from utils.redis_local import LocalRedis
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_database()
+
+    with app.app_context():
+        stale = listed_after_blacklisting(
+            refdata, lambda: refdata.LocalBackend(Config.REFDATA_CACHE_TTL, Config.REFDATA_CACHE_SIZE))
+        print(f'local backend: blacklisted doctor still listed on the other worker: {stale}')
+        assert stale, 'expected the per-process cache to serve the old directory'
+
+        with contextlib.ExitStack() as stack:
+            url = args.url or stack.enter_context(LocalRedis()).url
+            prefix = f'refdata-check-{os.getpid()}:'
+            stale = listed_after_blacklisting(
+                refdata, lambda: refdata.RedisBackend(url, Config.REFDATA_CACHE_TTL, prefix=prefix))
+            print(f'redis backend ({url}): blacklisted doctor still listed on the other worker: {stale}')
+            assert not stale, 'the shared backend served a stale directory'
+
+    print("[SUCCESS] The shared backend invalidates every worker at once")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Read-replica routing check
+Uses two local SQLite files as a primary/replica stand-in: the replica is a
+copy of the primary that is only refreshed when this script "replicates",
+so replication lag is total until then. Asserts that read-only views read
+the replica, that writes go to the primary, and that a patient who just
+booked reads the primary until REPLICA_STICKY_SECONDS have passed.
+
+Usage:
+    python benchmarks/replica_routing.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time as timer
+from collections import Counter
+from datetime import date, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STICKY_SECONDS = 1
+
+def replicate(primary, replica):
+    """Copy the primary file onto the replica, standing in for streaming replication"""
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='hms-bench-')
+    primary, replica = os.path.join(workdir, 'primary.db'), os.path.join(workdir, 'replica.db')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + primary
+    os.environ['DATABASE_REPLICA_URIS'] = 'sqlite:///' + replica
+    os.environ['REPLICA_STICKY_SECONDS'] = str(STICKY_SECONDS)
+    os.environ['MAIL_WORKER_IN_PROCESS'] = 'False'
+
+    from app import app
+    from extensions import db
+    from init_db import init_database
+    from models import Appointment, Doctor, DoctorAvailability
+    from sqlalchemy import event
+
+    init_database()
+    with app.app_context():
+        doctor = Doctor.query.first()
+        for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']:
+            db.session.add(DoctorAvailability(doctor_id=doctor.id, day_of_week=day,
+                                              start_time=time(9, 0), end_time=time(17, 0)))
+        db.session.commit()
+        doctor_id = doctor.id
+        engines = {'primary': db.engines[None], 'replica': db.engines['replica_0']}
+    replicate(primary, replica)
+
+    statements = Counter()
+    for name, engine in engines.items():
+        event.listen(engine, 'before_cursor_execute',
+                     lambda *args, name=name: statements.update([name]))
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'patient_1'
+        session['_fresh'] = True
+
+    def get(url):
+        statements.clear()
+        response = client.get(url)
+        assert response.status_code == 200, f'{url} returned {response.status_code}'
+        return response.get_data(as_text=True), dict(statements)
+
+    slot_date = (date.today() + timedelta(days=2)).isoformat()
+
+    # 1. Read-only views read the replica (after warming the user loader's identity cache and
+    #    the reference data cache, whose misses always read the primary). The doctor directory
+    #    renders from the reference data cache alone, so once warm it reads neither database.
+    get('/patient/dashboard')
+    get('/patient/doctors')
+    for url in ['/patient/dashboard', '/patient/doctors', f'/patient/doctors/{doctor_id}',
+                '/patient/appointments', '/patient/history']:
+        _, used = get(url)
+        print(f"{url:<36} {used}")
+        if url == '/patient/doctors':
+            assert not used, f'{url} should be served from the reference data cache: {used}'
+        else:
+            assert used.get('replica') and not used.get('primary'), f'{url} should only read the replica: {used}'
+
+    # 2. Booking writes to the primary, the replica has not seen it yet
+    statements.clear()
+    response = client.post(f'/patient/appointments/book/{doctor_id}', data={'date': slot_date, 'time': '10:00'})
+    print(f"{'POST book':<36} {dict(statements)}")
+    assert response.status_code == 302 and response.headers['Location'].endswith('/patient/appointments')
+    assert not statements.get('replica'), 'the booking must not touch the replica'
+    with sqlite3.connect(replica) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM appointments').fetchone()[0] == 0
+
+    # 3. Sticky after write: the patient's next page reads the primary and shows the booking
+    page, used = get('/patient/appointments')
+    print(f"{'appointments (sticky)':<36} {used}")
+    assert used.get('primary') and not used.get('replica'), f'expected primary reads while sticky: {used}'
+    assert slot_date in page, 'the new appointment should be listed'
+
+    # 4. After the sticky window the lagging replica is read again
+    timer.sleep(STICKY_SECONDS + 0.1)
+    page, used = get('/patient/appointments')
+    print(f"{'appointments (lagging replica)':<36} {used}")
+    assert used.get('replica') and not used.get('primary')
+    assert slot_date not in page, 'the replica has not replicated the booking yet'
+
+    # 5. Once replicated the replica serves it
+    replicate(primary, replica)
+    page, used = get('/patient/appointments')
+    print(f"{'appointments (replicated)':<36} {used}")
+    assert slot_date in page
+
+    with app.app_context():
+        assert Appointment.query.count() == 1
+    print("[SUCCESS] Reads routed to the replica, writes and recent writers to the primary")
+
+if __name__ == '__main__':
+    main()
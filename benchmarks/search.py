@@ -0,0 +1,86 @@
+"""
+Admin search benchmark
+Loads a synthetic patient table, builds the FTS index and compares the old
+leading-wildcard ILIKE scan (which returned every match) with the ranked,
+paginated full-text lookup.
+
+Usage:
+    python benchmarks/search.py --patients 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Priya', 'Wei']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Patel', 'Chen']
+
+QUERIES = ['smith', 'jennifer', 'patel', 'son', '555-01', 'p123456@', 'nomatch-xyz']
+
+def timed(f, repeat):
+    """Mean milliseconds per call and the last result"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = f()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='hms-bench-')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'search.db')
+
+    from app import app
+    from extensions import db
+    from models import Patient
+    from utils.search import rebuild_search_index, search_patients
+
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+
+        print(f"Inserting {args.patients} patients...")
+        start = time.perf_counter()
+        batch = []
+        for i in range(args.patients):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            batch.append({
+                'name': f'{first} {last}',
+                'email': f'{first.lower()}.{last.lower()}.p{i}@example.com',
+                'contact': f'555-{rng.randint(0, 9999):04d}',
+                'password_hash': 'x',
+            })
+            if len(batch) == 50000:
+                db.session.execute(Patient.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(Patient.__table__.insert(), batch)
+        db.session.commit()
+        print(f"  {time.perf_counter() - start:.1f}s")
+
+        print("Building search index...")
+        start = time.perf_counter()
+        with db.engine.begin() as conn:
+            rebuild_search_index(conn)
+        print(f"  {time.perf_counter() - start:.1f}s")
+
+        print(f"\n{'query':<14} {'ILIKE scan':>12} {'FTS ranked':>12}   matches")
+        for query in QUERIES:
+            pattern = f'%{query}%'
+            ilike_ms, matches = timed(lambda: Patient.query.filter(
+                Patient.name.ilike(pattern) | Patient.email.ilike(pattern) | Patient.contact.ilike(pattern)
+            ).all(), args.repeat)
+            fts_ms, _ = timed(lambda: search_patients(query, 1, 20), args.repeat)
+            print(f"{query:<14} {ilike_ms:10.2f}ms {fts_ms:10.2f}ms   {len(matches)}")
+
+if __name__ == '__main__':
+    main()
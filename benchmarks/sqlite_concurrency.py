@@ -0,0 +1,169 @@
+"""
+SQLite write concurrency benchmark
+Runs the same mixed workload twice against fresh database files: first with
+SQLITE_PRAGMAS=False (rollback journal, synchronous=FULL, driver defaults),
+then with the tuned connect pragmas from Config (WAL, synchronous=NORMAL,
+busy_timeout, mmap). Several processes, each with writer and reader threads,
+book distinct appointment slots through utils.booking while readers page
+through the appointment list. Each configuration runs in fresh processes so
+Config is re-read from the environment.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py --processes 4 --writers 4 --readers 2 --writes 200
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time as timer
+from datetime import date, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SLOTS_PER_DAY = 8
+
+def setup(database, writers):
+    """Create the schema, one doctor available every day and a patient per writer"""
+    os.environ['DATABASE_URI'] = 'sqlite:///' + database
+    from app import app
+    from extensions import db
+    from models import Department, Doctor, DoctorAvailability, Patient
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Department), [{'department_name': 'General'}])
+        db.session.execute(db.insert(Doctor), [
+            {'name': 'Doctor', 'email': 'doctor@bench.local', 'password_hash': 'x', 'specialization_id': 1}
+        ])
+        db.session.execute(db.insert(Patient), [
+            {'name': f'Patient {i}', 'email': f'patient{i}@bench.local', 'password_hash': 'x'}
+            for i in range(writers)
+        ])
+        db.session.execute(db.insert(DoctorAvailability), [
+            {'doctor_id': 1, 'day_of_week': day, 'start_time': time(9, 0), 'end_time': time(17, 0)}
+            for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        ])
+        db.session.commit()
+
+def run_process(database, process_index, processes, writers, readers, writes, think_time, results):
+    """One server process: writer threads booking slots, reader threads listing appointments"""
+    os.environ['DATABASE_URI'] = 'sqlite:///' + database
+    from app import app
+    from extensions import db
+    from models import Appointment
+    from utils.booking import book_slot
+    from utils.queries import appointment_query
+
+    start_date = date.today() + timedelta(days=1)
+    latencies, errors, reads = [], [], [0]
+    lock = threading.Lock()
+    writing = threading.Event()
+    writing.set()
+    barrier = threading.Barrier(writers + readers)
+
+    def writer(thread_index):
+        patient_id = (process_index * writers + thread_index) % writers + 1
+        barrier.wait()
+        for i in range(writes):
+            # Every (process, thread, i) gets its own slot
+            n = (i * writers + thread_index) * processes + process_index
+            slot_date = start_date + timedelta(days=n // SLOTS_PER_DAY)
+            slot_time = time(9 + n % SLOTS_PER_DAY, 0)
+            with app.app_context():
+                started = timer.perf_counter()
+                try:
+                    book_slot(patient_id, 1, slot_date, slot_time)
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(type(e).__name__ + ': ' + str(e).split('\n')[0])
+                    continue
+                elapsed = timer.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    def reader():
+        barrier.wait()
+        while writing.is_set():
+            with app.app_context():
+                try:
+                    appointment_query().filter(Appointment.doctor_id == 1).order_by(
+                        Appointment.date.desc(), Appointment.time.desc()).limit(50).all()
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(type(e).__name__ + ': ' + str(e).split('\n')[0])
+                    continue
+            with lock:
+                reads[0] += 1
+            timer.sleep(think_time)
+
+    write_threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    read_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    started = timer.perf_counter()
+    for thread in write_threads + read_threads:
+        thread.start()
+    for thread in write_threads:
+        thread.join()
+    elapsed = timer.perf_counter() - started
+    writing.clear()
+    for thread in read_threads:
+        thread.join()
+
+    results.put({'latencies': latencies, 'errors': errors, 'reads': reads[0], 'elapsed': elapsed})
+
+def run(label, env, args):
+    context = multiprocessing.get_context('fork')
+    database = os.path.join(tempfile.mkdtemp(prefix='hms-bench-'), 'concurrency.db')
+
+    def in_child(target, *target_args):
+        process = context.Process(target=_with_env, args=(env, target) + target_args)
+        process.start()
+        return process
+
+    process = in_child(setup, database, args.writers)
+    process.join()
+
+    results = context.Queue()
+    processes = [in_child(run_process, database, i, args.processes, args.writers, args.readers, args.writes,
+                          args.think_time / 1000, results)
+                 for i in range(args.processes)]
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(l for outcome in outcomes for l in outcome['latencies'])
+    errors = [e for outcome in outcomes for e in outcome['errors']]
+    elapsed = max(outcome['elapsed'] for outcome in outcomes)
+    reads = sum(outcome['reads'] for outcome in outcomes)
+    p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else float('nan')
+
+    print(f"{label:<8} {len(latencies) / elapsed:10.1f} {reads / elapsed:10.1f} "
+          f"{statistics.median(latencies) * 1000 if latencies else float('nan'):9.2f} {p95:9.2f} {len(errors):8}")
+    for message in sorted(set(errors))[:3]:
+        print(f"         {errors.count(message)} x {message}")
+
+def _with_env(env, target, *args):
+    os.environ.update(env)
+    target(*args)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4, help='writer threads per process')
+    parser.add_argument('--readers', type=int, default=2, help='reader threads per process')
+    parser.add_argument('--writes', type=int, default=200, help='bookings per writer thread')
+    parser.add_argument('--think-time', type=float, default=5, help='milliseconds a reader waits between pages')
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x ({args.writers} writers + {args.readers} readers), "
+          f"{args.writes} bookings per writer\n")
+    print(f"{'config':<8} {'writes/s':>10} {'reads/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'errors':>8}")
+    run('before', {'SQLITE_PRAGMAS': 'False', 'MAIL_WORKER_IN_PROCESS': 'False'}, args)
+    run('after', {'SQLITE_PRAGMAS': 'True', 'MAIL_WORKER_IN_PROCESS': 'False'}, args)
+
+if __name__ == '__main__':
+    main()
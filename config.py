@@ -4,11 +4,111 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Connection pool settings per deployment profile, chosen with DB_PROFILE
+DB_PROFILES = {
+    'development': {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': -1, 'pool_pre_ping': False},
+    'production': {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 10, 'pool_recycle': 1800, 'pool_pre_ping': True},
+}
+
+def engine_options(uri, profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI and profile, DB_POOL_* variables override the profile"""
+    if uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:'):
+        return {}  # In-memory SQLite uses a single shared connection, pool sizing does not apply
+
+    options = dict(DB_PROFILES[profile])
+    overrides = {
+        'pool_size': ('DB_POOL_SIZE', int),
+        'max_overflow': ('DB_MAX_OVERFLOW', int),
+        'pool_timeout': ('DB_POOL_TIMEOUT', int),
+        'pool_recycle': ('DB_POOL_RECYCLE', int),
+        'pool_pre_ping': ('DB_POOL_PRE_PING', lambda value: value == 'True'),
+    }
+    for option, (name, convert) in overrides.items():
+        if os.getenv(name):
+            options[option] = convert(os.getenv(name))
+    return options
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI', 'sqlite:///hospital.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_PROFILE = os.getenv('DB_PROFILE', 'development')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, DB_PROFILE)
+
+    # Read Replicas (comma-separated URIs, read by views marked @use_replica)
+    DATABASE_REPLICA_URIS = [uri for uri in os.getenv('DATABASE_REPLICA_URIS', '').split(',') if uri]
+    SQLALCHEMY_BINDS = {f'replica_{i}': uri for i, uri in enumerate(DATABASE_REPLICA_URIS)}
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))  # Read the primary after writing
+
+    # SQLite Connection Pragmas (applied to every new connection)
+    SQLITE_PRAGMAS = os.getenv('SQLITE_PRAGMAS', 'True') == 'True'
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # Milliseconds
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # List Pagination
+    PER_PAGE = int(os.getenv('PER_PAGE', 50))
+    MAX_PER_PAGE = int(os.getenv('MAX_PER_PAGE', 200))
+    STREAM_LIST_PAGES = os.getenv('STREAM_LIST_PAGES', 'False') == 'True'
+    SEARCH_PER_PAGE = int(os.getenv('SEARCH_PER_PAGE', 20))
+
+    # Typeahead Suggestions
+    TYPEAHEAD_LIMIT = int(os.getenv('TYPEAHEAD_LIMIT', 8))
+    TYPEAHEAD_MAX_LIMIT = int(os.getenv('TYPEAHEAD_MAX_LIMIT', 25))
+    TYPEAHEAD_REBUILD_INTERVAL = int(os.getenv('TYPEAHEAD_REBUILD_INTERVAL', 600))
+
+    # Dashboard Statistics Cache
+    STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', 30))
+    STATS_CACHE_SIZE = int(os.getenv('STATS_CACHE_SIZE', 4096))
+
+    # Reference Data Cache (departments, doctor directory); 'local' or 'redis'
+    REFDATA_CACHE_BACKEND = os.getenv('REFDATA_CACHE_BACKEND', 'local')
+    REFDATA_CACHE_URL = os.getenv('REFDATA_CACHE_URL', 'redis://localhost:6379/0')
+    REFDATA_CACHE_TTL = int(os.getenv('REFDATA_CACHE_TTL', 30))
+    REFDATA_CACHE_SIZE = int(os.getenv('REFDATA_CACHE_SIZE', 64))
+
+    # Conditional GET (ETag / Last-Modified on history and directory pages)
+    CONDITIONAL_GET = os.getenv('CONDITIONAL_GET', 'True') == 'True'
+
+    # Admin Analytics (reports are one aggregate pass, cached per date range)
+    ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 300))
+    ANALYTICS_MAX_WEEKS = int(os.getenv('ANALYTICS_MAX_WEEKS', 104))
+
+    # Appointment Export (rows fetched and encoded per chunk)
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 5000))
+
+    # Appointment Slots
+    APPOINTMENT_SLOT_MINUTES = int(os.getenv('APPOINTMENT_SLOT_MINUTES', 60))
+    SLOT_SEARCH_MAX_DAYS = int(os.getenv('SLOT_SEARCH_MAX_DAYS', 31))
+    EARLIEST_SLOTS_MAX = int(os.getenv('EARLIEST_SLOTS_MAX', 50))
+
+    # Doctor Schedule (days materialised from today, rebuild_schedule.py rolls the window daily)
+    SCHEDULE_DAYS = int(os.getenv('SCHEDULE_DAYS', 60))
+    DASHBOARD_UPCOMING_LIMIT = int(os.getenv('DASHBOARD_UPCOMING_LIMIT', 20))
+
+    # Password Hashing
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_FACTOR = int(os.getenv('PASSWORD_HASH_QUEUE_FACTOR', 4))
+
+    # Logged-in User Identity Cache (a suspended user stays logged in on other
+    # workers for up to USER_CACHE_TTL seconds unless REFDATA_CACHE_BACKEND=redis)
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+
+    # SQL Profiling (off by default, no hooks are installed unless enabled)
+    SQL_PROFILING = os.getenv('SQL_PROFILING', 'False') == 'True'
+    SQL_PROFILING_SERVER_TIMING = os.getenv('SQL_PROFILING_SERVER_TIMING', 'False') == 'True'
+    SQL_PROFILING_N_PLUS_ONE = int(os.getenv('SQL_PROFILING_N_PLUS_ONE', 5))
+    SQL_PROFILING_SLOWEST = int(os.getenv('SQL_PROFILING_SLOWEST', 10))
+
+    # Prometheus Metrics (METRICS_DIR aggregates multi-process servers)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+    METRICS_DIR = os.getenv('METRICS_DIR') or os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
 
     # Flask-Mail Configuration
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -18,6 +118,15 @@ class Config:
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_USERNAME')
 
+    # Outbound Mail Queue
+    MAIL_WORKER_IN_PROCESS = os.getenv('MAIL_WORKER_IN_PROCESS', 'True') == 'True'
+    MAIL_OUTBOX_BATCH_SIZE = int(os.getenv('MAIL_OUTBOX_BATCH_SIZE', 50))
+    MAIL_OUTBOX_POLL_INTERVAL = int(os.getenv('MAIL_OUTBOX_POLL_INTERVAL', 10))
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('MAIL_OUTBOX_MAX_ATTEMPTS', 6))
+    MAIL_OUTBOX_RETRY_BASE = int(os.getenv('MAIL_OUTBOX_RETRY_BASE', 30))
+    MAIL_OUTBOX_RETRY_MAX = int(os.getenv('MAIL_OUTBOX_RETRY_MAX', 3600))
+    MAIL_OUTBOX_CLAIM_TIMEOUT = int(os.getenv('MAIL_OUTBOX_CLAIM_TIMEOUT', 300))
+
     # Admin Credentials
     ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
     ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'admin123')
@@ -5,8 +5,9 @@ Separate file to avoid circular imports
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_mail import Mail
+from utils.replicas import RoutingSession
 
 # Initialize extensions (without app)
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 mail = Mail()
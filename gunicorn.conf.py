@@ -0,0 +1,22 @@
+"""
+Gunicorn settings
+Each worker process starts its own background threads after the fork, so
+they also run under --preload, where the app is imported once in the master.
+An exited worker's metrics file is removed from METRICS_DIR.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+def post_fork(server, worker):
+    from app import start_server_threads
+    start_server_threads()
+
+def child_exit(server, worker):
+    from utils.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -9,6 +9,7 @@ from models.department import Department
 from models.doctor import Doctor
 from models.patient import Patient
 from config import Config
+from migrations import schema_version, stamp_head
 from datetime import date
 
 def init_database():
@@ -17,11 +18,15 @@ def init_database():
         # Drop all existing tables (for development)
         print("Dropping existing tables...")
         db.drop_all()
+        schema_version.drop(db.engine, checkfirst=True)
 
         # Create all tables
         print("Creating database tables...")
         db.create_all()
 
+        # Fresh schema already matches the latest migration
+        stamp_head(db.engine)
+
         # Create predefined admin user
         print("Creating admin user...")
         admin = Admin(
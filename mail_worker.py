@@ -0,0 +1,29 @@
+"""
+Outbox mail worker
+Delivers queued emails from the outbox_messages table. Run it as its own
+process and set MAIL_WORKER_IN_PROCESS=False for multi-process deployments.
+
+Usage:
+    python mail_worker.py          # run until interrupted
+    python mail_worker.py --once   # deliver everything due, then exit
+"""
+import sys
+from app import app
+from utils.mailer import run_mail_worker, send_pending
+
+if __name__ == '__main__':
+    if '--once' in sys.argv:
+        with app.app_context():
+            total = 0
+            while True:
+                claimed = send_pending()
+                total += claimed
+                if claimed < app.config['MAIL_OUTBOX_BATCH_SIZE']:
+                    break
+        print(f"Processed {total} queued message(s)")
+    else:
+        print("Mail worker running, press Ctrl+C to stop")
+        try:
+            run_mail_worker(app)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,242 @@
+"""
+Versioned schema migrations
+Brings existing databases up to date without drop_all/create_all.
+Applied versions are recorded in the schema_version table.
+
+Usage:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # show current and latest version
+"""
+import sys
+from datetime import datetime, time
+from sqlalchemy import (Column, Date, DateTime, Index, Integer, MetaData, String, Table, Text, Time, UniqueConstraint,
+                        func, inspect, select, text)
+
+MIGRATIONS = []
+
+_version_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, default=datetime.utcnow)
+)
+
+def migration(version, description):
+    """Register a migration function, applied in version order"""
+    def decorator(f):
+        MIGRATIONS.append((version, description, f))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return f
+    return decorator
+
+def head_version():
+    """Latest known migration version"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+def current_version(conn):
+    """Highest applied migration version, 0 for an unversioned database"""
+    schema_version.create(conn, checkfirst=True)
+    version = conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).first()
+    return version[0] if version else 0
+
+def upgrade(engine):
+    """Apply all pending migrations, each in its own transaction"""
+    with engine.begin() as conn:
+        current = current_version(conn)
+
+    applied = []
+    for version, description, f in MIGRATIONS:
+        if version <= current:
+            continue
+        with engine.begin() as conn:
+            f(conn)
+            conn.execute(schema_version.insert().values(version=version, description=description,
+                                                        applied_at=datetime.utcnow()))
+        applied.append((version, description))
+    return applied
+
+def stamp_head(engine):
+    """Mark every migration as applied (for databases built by create_all)"""
+    with engine.begin() as conn:
+        current = current_version(conn)
+        for version, description, _ in MIGRATIONS:
+            if version > current:
+                conn.execute(schema_version.insert().values(version=version, description=description,
+                                                            applied_at=datetime.utcnow()))
+
+# Migration helpers
+
+def _reflect(conn, table_name):
+    """Reflect a table as it exists in the database"""
+    return Table(table_name, MetaData(), autoload_with=conn)
+
+def _create_index(conn, table_name, index_name, *columns, unique=False, **dialect_kwargs):
+    """Create an index if it does not exist yet"""
+    existing = {ix['name'] for ix in inspect(conn).get_indexes(table_name)}
+    if index_name in existing:
+        return
+    table = _reflect(conn, table_name)
+    Index(index_name, *[table.c[name] for name in columns], unique=unique, **dialect_kwargs).create(conn)
+
+# Migrations
+
+@migration(1, 'Add indexes for appointment and treatment hot predicates')
+def add_appointment_indexes(conn):
+    _create_index(conn, 'appointments', 'ix_appointments_doctor_date_time', 'doctor_id', 'date', 'time')
+    _create_index(conn, 'appointments', 'ix_appointments_patient_date_time', 'patient_id', 'date', 'time')
+    _create_index(conn, 'appointments', 'ix_appointments_doctor_status', 'doctor_id', 'status')
+    _create_index(conn, 'appointments', 'ix_appointments_status_date', 'status', 'date')
+    _create_index(conn, 'appointments', 'ix_appointments_date_time_id', 'date', 'time', 'id')
+    _create_index(conn, 'treatments', 'ix_treatments_created_at', 'created_at')
+
+@migration(2, 'Enforce one active appointment per doctor slot')
+def add_doctor_slot_unique_index(conn):
+    # Partial indexes only exist on SQLite and PostgreSQL, see models/appointment.py
+    if conn.dialect.name not in ('sqlite', 'postgresql'):
+        return
+    appointments = _reflect(conn, 'appointments')
+    duplicates = conn.execute(
+        select(appointments.c.doctor_id, appointments.c.date, appointments.c.time, func.count())
+        .where(appointments.c.status != 'Cancelled')
+        .group_by(appointments.c.doctor_id, appointments.c.date, appointments.c.time)
+        .having(func.count() > 1)
+    ).all()
+    if duplicates:
+        listing = '\n'.join(f'  doctor {d} on {day} at {t}: {n} appointments' for d, day, t, n in duplicates)
+        raise RuntimeError(f'Double-booked slots must be cancelled before migrating:\n{listing}')
+
+    active = text("status != 'Cancelled'")
+    _create_index(conn, 'appointments', 'uq_appointments_doctor_slot_active', 'doctor_id', 'date', 'time',
+                  unique=True, sqlite_where=active, postgresql_where=active)
+
+@migration(3, 'Convert appointments.time from VARCHAR to TIME')
+def convert_appointment_time(conn):
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        conn.execute(text('ALTER TABLE appointments ALTER COLUMN time TYPE TIME USING CAST(time AS TIME)'))
+    elif dialect in ('mysql', 'mariadb'):
+        conn.execute(text('ALTER TABLE appointments MODIFY COLUMN time TIME NOT NULL'))
+    elif dialect == 'sqlite':
+        # SQLite keeps the declared type; rewrite values into SQLAlchemy's TIME storage format
+        for (value,) in conn.execute(text('SELECT DISTINCT time FROM appointments')).all():
+            converted = time.fromisoformat(value).strftime('%H:%M:%S.%f')
+            if converted != value:
+                conn.execute(text('UPDATE appointments SET time = :new WHERE time = :old'),
+                             {'new': converted, 'old': value})
+    else:
+        raise RuntimeError(f'No TIME conversion defined for {dialect}')
+
+@migration(4, 'Add user_identities email index')
+def add_user_identities(conn):
+    user_identities = Table(
+        'user_identities', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('email', String(120), unique=True, nullable=False),
+        Column('role', String(10), nullable=False),
+        Column('user_id', Integer, nullable=False),
+        UniqueConstraint('role', 'user_id', name='unique_role_user')
+    )
+    user_identities.create(conn, checkfirst=True)
+
+    # Backfill in the old login lookup order, so an email shared across tables keeps resolving the same way
+    seen = {email for (email,) in conn.execute(select(user_identities.c.email))}
+    for role, table_name in (('admin', 'admins'), ('doctor', 'doctors'), ('patient', 'patients')):
+        table = _reflect(conn, table_name)
+        rows = [
+            {'email': email, 'role': role, 'user_id': user_id}
+            for user_id, email in conn.execute(select(table.c.id, table.c.email))
+            if email not in seen
+        ]
+        seen.update(row['email'] for row in rows)
+        if rows:
+            conn.execute(user_identities.insert(), rows)
+
+@migration(5, 'Add outbox_messages mail queue')
+def add_outbox_messages(conn):
+    outbox_messages = Table(
+        'outbox_messages', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('recipients', Text, nullable=False),
+        Column('subject', String(255), nullable=False),
+        Column('body', Text),
+        Column('status', String(20)),
+        Column('attempts', Integer),
+        Column('next_attempt_at', DateTime),
+        Column('last_error', Text),
+        Column('created_at', DateTime),
+        Column('sent_at', DateTime),
+        Index('ix_outbox_messages_status_next_attempt', 'status', 'next_attempt_at')
+    )
+    outbox_messages.create(conn, checkfirst=True)
+
+@migration(6, 'Add full-text search index for patients and doctors')
+def add_search_index(conn):
+    from utils.search import create_search_index, rebuild_search_index
+    create_search_index(conn)
+    rebuild_search_index(conn)
+
+@migration(7, 'Add updated_at change stamps for conditional GET')
+def add_updated_at(conn):
+    column_type = DateTime().compile(dialect=conn.dialect)
+    for table_name in ('doctors', 'patients', 'departments', 'treatments'):
+        if 'updated_at' in {c['name'] for c in inspect(conn).get_columns(table_name)}:
+            continue
+        conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN updated_at {column_type}'))
+        conn.execute(text(f'UPDATE {table_name} SET updated_at = created_at'))
+
+@migration(8, 'Add import_jobs checkpoints for bulk imports')
+def add_import_jobs(conn):
+    import_jobs = Table(
+        'import_jobs', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('name', String(255), unique=True, nullable=False),
+        Column('kind', String(20), nullable=False),
+        Column('source', Text, nullable=False),
+        Column('fingerprint', String(64), nullable=False),
+        Column('rows_read', Integer),
+        Column('rows_imported', Integer),
+        Column('rows_bad', Integer),
+        Column('status', String(20)),
+        Column('started_at', DateTime),
+        Column('updated_at', DateTime)
+    )
+    import_jobs.create(conn, checkfirst=True)
+
+@migration(9, 'Add doctor_schedule_days materialised schedule')
+def add_doctor_schedule_days(conn):
+    # Filled by rebuild_schedule.py, until then schedules are computed live
+    doctor_schedule_days = Table(
+        'doctor_schedule_days', MetaData(),
+        Column('doctor_id', Integer, primary_key=True),
+        Column('date', Date, primary_key=True),
+        Column('capacity', Integer, nullable=False),
+        Column('booked', Integer, nullable=False),
+        Column('completed', Integer, nullable=False),
+        Column('cancelled', Integer, nullable=False),
+        Column('free', Integer, nullable=False),
+        Column('next_free', Time),
+        Column('free_slots', Text, nullable=False),
+        Column('booked_slots', Text, nullable=False),
+        Column('updated_at', DateTime)
+    )
+    doctor_schedule_days.create(conn, checkfirst=True)
+
+@migration(10, 'Add covering index for admin analytics')
+def add_analytics_index(conn):
+    _create_index(conn, 'appointments', 'ix_appointments_doctor_date_status', 'doctor_id', 'date', 'status')
+
+if __name__ == '__main__':
+    from app import app
+    from extensions import db
+
+    with app.app_context():
+        if '--status' in sys.argv:
+            with db.engine.begin() as conn:
+                print(f"Current version: {current_version(conn)}")
+            print(f"Latest version: {head_version()}")
+        else:
+            applied = upgrade(db.engine)
+            for version, description in applied:
+                print(f"Applied migration {version}: {description}")
+            print(f"\n[SUCCESS] Database is at version {head_version()}")
@@ -6,6 +6,10 @@ from models.department import Department
 from models.appointment import Appointment
 from models.treatment import Treatment
 from models.doctor_availability import DoctorAvailability
+from models.user_identity import UserIdentity
+from models.outbox import OutboxMessage
+from models.import_job import ImportJob
+from models.doctor_schedule import DoctorScheduleDay
 
 __all__ = [
     'Admin',
@@ -14,5 +18,9 @@ __all__ = [
     'Department',
     'Appointment',
     'Treatment',
-    'DoctorAvailability'
+    'DoctorAvailability',
+    'UserIdentity',
+    'OutboxMessage',
+    'ImportJob',
+    'DoctorScheduleDay'
 ]
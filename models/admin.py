@@ -1,6 +1,6 @@
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.passwords import hash_password, verify_password
 from extensions import db
 
 class Admin(UserMixin, db.Model):
@@ -16,11 +16,11 @@ class Admin(UserMixin, db.Model):
 
     def set_password(self, password):
         """Hash and set the password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """Check if the provided password matches the hash"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def get_id(self):
         """Return unique ID for Flask-Login"""
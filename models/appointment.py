@@ -1,6 +1,8 @@
 from datetime import datetime
 from extensions import db
 
+STATUSES = ('Booked', 'Completed', 'Cancelled')
+
 class Appointment(db.Model):
     """Appointment model - links patients and doctors with time slots"""
     __tablename__ = 'appointments'
@@ -9,7 +11,7 @@ class Appointment(db.Model):
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
-    time = db.Column(db.String(10), nullable=False)  # Format: "09:00", "10:00", etc.
+    time = db.Column(db.Time, nullable=False)
     status = db.Column(db.String(20), default='Booked')  # Booked / Completed / Cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -17,5 +19,21 @@ class Appointment(db.Model):
     # Relationships
     treatment = db.relationship('Treatment', backref='appointment', uselist=False, cascade='all, delete-orphan')
 
+    # Indexes for the hot list, dashboard and booking-conflict predicates
+    __table_args__ = (
+        db.Index('ix_appointments_doctor_date_time', 'doctor_id', 'date', 'time'),
+        db.Index('ix_appointments_patient_date_time', 'patient_id', 'date', 'time'),
+        db.Index('ix_appointments_doctor_status', 'doctor_id', 'status'),
+        db.Index('ix_appointments_doctor_date_status', 'doctor_id', 'date', 'status'),
+        db.Index('ix_appointments_status_date', 'status', 'date'),
+        db.Index('ix_appointments_date_time_id', 'date', 'time', 'id'),
+        # A doctor's slot can hold at most one non-cancelled appointment. Only SQLite and
+        # PostgreSQL have partial indexes; elsewhere a plain unique index would stop a
+        # cancelled slot from ever being rebooked, so none is created there
+        db.Index('uq_appointments_doctor_slot_active', 'doctor_id', 'date', 'time', unique=True,
+                 sqlite_where=db.text("status != 'Cancelled'"),
+                 postgresql_where=db.text("status != 'Cancelled'")).ddl_if(dialect=('sqlite', 'postgresql')),
+    )
+
     def __repr__(self):
         return f'<Appointment {self.id}: {self.date} {self.time} - {self.status}>'
@@ -9,6 +9,7 @@ class Department(db.Model):
     department_name = db.Column(db.String(100), nullable=False, unique=True)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     doctors = db.relationship('Doctor', backref='department_rel', lazy='dynamic')
@@ -0,0 +1,21 @@
+from datetime import datetime
+from extensions import db
+
+class DoctorScheduleDay(db.Model):
+    """Materialised schedule of one doctor on one day, maintained by utils.schedule"""
+    __tablename__ = 'doctor_schedule_days'
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    capacity = db.Column(db.Integer, nullable=False, default=0)  # Slots in the day's availability window
+    booked = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
+    free = db.Column(db.Integer, nullable=False, default=0)
+    next_free = db.Column(db.Time)  # First free slot of the day
+    free_slots = db.Column(db.Text, nullable=False, default='')  # Comma-separated HH:MM
+    booked_slots = db.Column(db.Text, nullable=False, default='')  # Slots held by Booked/Completed appointments
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DoctorScheduleDay Doctor:{self.doctor_id} {self.date} {self.free}/{self.capacity} free>'
@@ -0,0 +1,21 @@
+from datetime import datetime
+from extensions import db
+
+class ImportJob(db.Model):
+    """Checkpoint of a bulk import, advanced in the same transaction as each imported chunk"""
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), unique=True, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # doctors / patients / appointments
+    source = db.Column(db.Text, nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # Size and leading bytes of the source file
+    rows_read = db.Column(db.Integer, default=0)
+    rows_imported = db.Column(db.Integer, default=0)
+    rows_bad = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='Running')  # Running / Done
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ImportJob {self.name} {self.status} at row {self.rows_read}>'
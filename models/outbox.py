@@ -0,0 +1,29 @@
+from datetime import datetime
+from extensions import db
+
+class OutboxMessage(db.Model):
+    """Outbound email queued by request handlers and delivered by the mail worker"""
+    __tablename__ = 'outbox_messages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Text, nullable=False)  # Comma-separated addresses
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text)  # Cleared once sent, it may contain credentials
+    status = db.Column(db.String(20), default='Pending')  # Pending / Sending / Sent / Failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_outbox_messages_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    @property
+    def recipient_list(self):
+        """Recipients as a list"""
+        return [address for address in self.recipients.split(',') if address]
+
+    def __repr__(self):
+        return f'<OutboxMessage {self.id} {self.status} to {self.recipients}>'
@@ -1,6 +1,6 @@
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.passwords import hash_password, verify_password
 from extensions import db
 
 class Patient(UserMixin, db.Model):
@@ -15,17 +15,18 @@ class Patient(UserMixin, db.Model):
     date_of_birth = db.Column(db.Date)
     is_blacklisted = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     appointments = db.relationship('Appointment', backref='patient', lazy='dynamic')
 
     def set_password(self, password):
         """Hash and set the password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """Check if the provided password matches the hash"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def get_id(self):
         """Return unique ID for Flask-Login"""
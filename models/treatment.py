@@ -10,7 +10,8 @@ class Treatment(db.Model):
     diagnosis = db.Column(db.Text, nullable=False)
     prescription = db.Column(db.Text)
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<Treatment for Appointment {self.appointment_id}>'
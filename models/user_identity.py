@@ -0,0 +1,56 @@
+from sqlalchemy import event
+from extensions import db
+from models.admin import Admin
+from models.doctor import Doctor
+from models.patient import Patient
+
+class UserIdentity(db.Model):
+    """User identity index - maps every login email to its role and user id"""
+    __tablename__ = 'user_identities'
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    role = db.Column(db.String(10), nullable=False)  # admin / doctor / patient
+    user_id = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('role', 'user_id', name='unique_role_user'),
+    )
+
+    MODELS = {
+        'admin': Admin,
+        'doctor': Doctor,
+        'patient': Patient,
+    }
+
+    def get_user(self):
+        """Load the Admin, Doctor or Patient this identity points to"""
+        return db.session.get(self.MODELS[self.role], self.user_id)
+
+    def __repr__(self):
+        return f'<UserIdentity {self.email} -> {self.role}_{self.user_id}>'
+
+# Keep the index in sync with the three user tables inside the same flush
+
+def _after_insert(mapper, connection, target):
+    connection.execute(UserIdentity.__table__.insert().values(
+        email=target.email, role=target.role, user_id=target.id
+    ))
+
+def _after_update(mapper, connection, target):
+    if db.inspect(target).attrs.email.history.has_changes():
+        table = UserIdentity.__table__
+        connection.execute(table.update().where(
+            table.c.role == target.role, table.c.user_id == target.id
+        ).values(email=target.email))
+
+def _after_delete(mapper, connection, target):
+    table = UserIdentity.__table__
+    connection.execute(table.delete().where(
+        table.c.role == target.role, table.c.user_id == target.id
+    ))
+
+for _model in (Admin, Doctor, Patient):
+    event.listen(_model, 'after_insert', _after_insert)
+    event.listen(_model, 'after_update', _after_update)
+    event.listen(_model, 'after_delete', _after_delete)
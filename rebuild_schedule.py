@@ -0,0 +1,29 @@
+"""
+Doctor schedule rebuild
+Recomputes doctor_schedule_days for every doctor over the SCHEDULE_DAYS
+window starting today, in one transaction, and drops the days before it.
+Run it daily (e.g. from cron just after midnight) so the window rolls
+forward; bookings, cancellations, completions and availability edits keep
+the rows current in between. Also run it after changing
+APPOINTMENT_SLOT_MINUTES or writing appointments outside the app.
+
+Usage:
+    python rebuild_schedule.py
+    SCHEDULE_DAYS=90 python rebuild_schedule.py --batch-size 500
+"""
+import argparse
+import time as timer
+from extensions import db
+from utils.schedule import rebuild
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=200, help='doctors computed per batch')
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        started = timer.perf_counter()
+        rows = rebuild(args.batch_size, log=print)
+        db.session.commit()
+        print(f'[SUCCESS] Rebuilt {rows:,} schedule days in {timer.perf_counter() - started:.1f}s')
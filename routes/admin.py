@@ -1,37 +1,48 @@
 """
 Admin routes - dashboard, doctor management, appointments, search
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import (Blueprint, Response, render_template, redirect, url_for, flash, request, jsonify, current_app,
+                   stream_with_context)
 from flask_login import login_required, current_user
-from extensions import db, mail
+from extensions import db
 from models.doctor import Doctor
 from models.patient import Patient
-from models.appointment import Appointment
-from models.department import Department
+from models.appointment import Appointment, STATUSES
+from models.user_identity import UserIdentity
 from utils.decorators import admin_required
-from flask_mail import Message
+from utils.replicas import use_replica
+from utils.queries import appointment_query, filter_time_window
+from utils.pagination import keyset_paginate, render_list
+from utils.stats import get_admin_stats, invalidate_stats
+from utils.identity import invalidate_identity
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from utils.mailer import enqueue_mail, notify_mail_worker
+from utils.search import search_patients, search_doctors
+from utils import refdata, typeahead
+from utils.analytics import default_range, get_report
+from utils.profiling import profiling_summary, reset_profiling
+from utils.export import FORMATS, export_chunks, export_statement
+from datetime import date, timedelta
 import secrets
 import string
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+def _email_taken(email, user):
+    """Whether another account of any role already logs in with this email"""
+    return UserIdentity.query.filter(
+        UserIdentity.email == email,
+        db.or_(UserIdentity.role != user.role, UserIdentity.user_id != user.id)
+    ).first() is not None
+
 @bp.route('/dashboard')
 @login_required
 @admin_required
+@use_replica
 def dashboard():
     """Admin dashboard with statistics"""
-    total_doctors = Doctor.query.count()
-    total_patients = Patient.query.count()
-    total_appointments = Appointment.query.count()
-    pending_appointments = Appointment.query.filter_by(status='Booked').count()
-
-    stats = {
-        'doctors': total_doctors,
-        'patients': total_patients,
-        'appointments': total_appointments,
-        'pending': pending_appointments
-    }
-
+    stats = get_admin_stats()
     return render_template('admin/dashboard.html', stats=stats)
 
 # Doctor Management Routes
@@ -39,10 +50,26 @@ def dashboard():
 @bp.route('/doctors')
 @login_required
 @admin_required
+@use_replica
 def doctors():
     """View all doctors"""
-    doctors = Doctor.query.order_by(Doctor.created_at.desc()).all()
-    return render_template('admin/doctors.html', doctors=doctors)
+    page = keyset_paginate(
+        Doctor.query.options(joinedload(Doctor.department_rel)),
+        [Doctor.created_at, Doctor.id]
+    )
+
+    # Doctors with appointments cannot be deleted - look them up in one query for the page
+    doctor_ids = [doctor.id for doctor in page.items]
+    doctors_with_appointments = {
+        row[0] for row in db.session.query(Appointment.doctor_id).filter(
+            Appointment.doctor_id.in_(doctor_ids)
+        ).distinct()
+    }
+
+    return render_list('admin/doctors.html',
+                       doctors=page.items,
+                       page=page,
+                       doctors_with_appointments=doctors_with_appointments)
 
 @bp.route('/doctors/add', methods=['GET', 'POST'])
 @login_required
@@ -60,8 +87,8 @@ def add_doctor():
             flash('Please fill in all required fields.', 'danger')
             return redirect(url_for('admin.add_doctor'))
 
-        # Check if email already exists
-        if Doctor.query.filter_by(email=email).first():
+        # Check if email already exists for any role
+        if UserIdentity.query.filter_by(email=email).first():
             flash('Email already exists.', 'danger')
             return redirect(url_for('admin.add_doctor'))
 
@@ -78,15 +105,12 @@ def add_doctor():
         doctor.set_password(password)
 
         db.session.add(doctor)
-        db.session.commit()
 
-        # Send email with credentials
-        try:
-            msg = Message(
-                'Your Doctor Account - Hospital Management System',
-                recipients=[email]
-            )
-            msg.body = f"""
+        # Queue email with credentials - committed together with the doctor
+        enqueue_mail(
+            'Your Doctor Account - Hospital Management System',
+            [email],
+            f"""
 Hello Dr. {name},
 
 Your doctor account has been created in the Hospital Management System.
@@ -100,14 +124,19 @@ Please login at: http://localhost:5000/auth/login
 Best regards,
 Hospital Management System
             """
-            mail.send(msg)
-            flash(f'Doctor added successfully! Login credentials sent to {email}', 'success')
-        except Exception as e:
-            flash(f'Doctor added but email failed to send. Password: {password}', 'warning')
+        )
+
+        db.session.commit()
+        notify_mail_worker()
+        refdata.invalidate('doctors')
+        invalidate_stats('admin')
+        invalidate_stats('patient')
+
+        flash(f'Doctor added successfully! Login credentials will be emailed to {email}', 'success')
 
         return redirect(url_for('admin.doctors'))
 
-    departments = Department.query.all()
+    departments = refdata.get_departments()
     return render_template('admin/add_doctor.html', departments=departments)
 
 @bp.route('/doctors/edit/<int:id>', methods=['GET', 'POST'])
@@ -117,17 +146,33 @@ def edit_doctor(id):
     """Edit doctor details"""
     doctor = Doctor.query.get_or_404(id)
 
+    departments = refdata.get_departments()
+
     if request.method == 'POST':
+        email = request.form.get('email')
+
+        # Check if email already exists for any other account
+        if _email_taken(email, doctor):
+            flash('Email already exists.', 'danger')
+            return render_template('admin/edit_doctor.html', doctor=doctor, departments=departments)
+
         doctor.name = request.form.get('name')
-        doctor.email = request.form.get('email')
+        doctor.email = email
         doctor.specialization_id = request.form.get('specialization_id')
         doctor.contact = request.form.get('contact')
 
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent change to the same email
+            db.session.rollback()
+            flash('Email already exists.', 'danger')
+            return render_template('admin/edit_doctor.html', doctor=doctor, departments=departments)
+        invalidate_identity(doctor)
+        refdata.invalidate('doctors')
         flash('Doctor updated successfully!', 'success')
         return redirect(url_for('admin.doctors'))
 
-    departments = Department.query.all()
     return render_template('admin/edit_doctor.html', doctor=doctor, departments=departments)
 
 @bp.route('/doctors/toggle-blacklist/<int:id>')
@@ -138,6 +183,9 @@ def toggle_blacklist_doctor(id):
     doctor = Doctor.query.get_or_404(id)
     doctor.is_blacklisted = not doctor.is_blacklisted
     db.session.commit()
+    invalidate_identity(doctor)
+    refdata.invalidate('doctors')
+    invalidate_stats('patient')
 
     status = 'blacklisted' if doctor.is_blacklisted else 'activated'
     flash(f'Doctor {doctor.name} has been {status}.', 'success')
@@ -157,6 +205,10 @@ def delete_doctor(id):
 
     db.session.delete(doctor)
     db.session.commit()
+    invalidate_identity(doctor)
+    refdata.invalidate('doctors')
+    invalidate_stats('admin')
+    invalidate_stats('patient')
     flash('Doctor deleted successfully!', 'success')
     return redirect(url_for('admin.doctors'))
 
@@ -165,10 +217,11 @@ def delete_doctor(id):
 @bp.route('/patients')
 @login_required
 @admin_required
+@use_replica
 def patients():
     """View all patients"""
-    patients = Patient.query.order_by(Patient.created_at.desc()).all()
-    return render_template('admin/patients.html', patients=patients)
+    page = keyset_paginate(Patient.query, [Patient.created_at, Patient.id])
+    return render_list('admin/patients.html', patients=page.items, page=page)
 
 @bp.route('/patients/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
@@ -178,11 +231,25 @@ def edit_patient(id):
     patient = Patient.query.get_or_404(id)
 
     if request.method == 'POST':
+        email = request.form.get('email')
+
+        # Check if email already exists for any other account
+        if _email_taken(email, patient):
+            flash('Email already exists.', 'danger')
+            return render_template('admin/edit_patient.html', patient=patient)
+
         patient.name = request.form.get('name')
-        patient.email = request.form.get('email')
+        patient.email = email
         patient.contact = request.form.get('contact')
 
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent change to the same email
+            db.session.rollback()
+            flash('Email already exists.', 'danger')
+            return render_template('admin/edit_patient.html', patient=patient)
+        invalidate_identity(patient)
         flash('Patient updated successfully!', 'success')
         return redirect(url_for('admin.patients'))
 
@@ -196,6 +263,7 @@ def toggle_blacklist_patient(id):
     patient = Patient.query.get_or_404(id)
     patient.is_blacklisted = not patient.is_blacklisted
     db.session.commit()
+    invalidate_identity(patient)
 
     status = 'blacklisted' if patient.is_blacklisted else 'activated'
     flash(f'Patient {patient.name} has been {status}.', 'success')
@@ -206,43 +274,126 @@ def toggle_blacklist_patient(id):
 @bp.route('/appointments')
 @login_required
 @admin_required
+@use_replica
 def appointments():
     """View all appointments"""
     status_filter = request.args.get('status', 'all')
 
-    if status_filter == 'all':
-        appointments = Appointment.query.order_by(Appointment.date.desc(), Appointment.time.desc()).all()
-    else:
-        appointments = Appointment.query.filter_by(status=status_filter).order_by(
-            Appointment.date.desc(), Appointment.time.desc()).all()
+    query = appointment_query()
+    if status_filter != 'all':
+        query = query.filter_by(status=status_filter)
+    query = filter_time_window(query)
+
+    page = keyset_paginate(query, [Appointment.date, Appointment.time, Appointment.id])
 
-    return render_template('admin/appointments.html', appointments=appointments, status_filter=status_filter)
+    return render_list('admin/appointments.html', appointments=page.items, page=page, status_filter=status_filter)
+
+@bp.route('/export/appointments.<fmt>')
+@login_required
+@admin_required
+@use_replica
+def export_appointments(fmt):
+    """Stream appointments with patient, doctor and treatment as CSV, NDJSON or columnar NDJSON"""
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Unknown format, expected one of {', '.join(FORMATS)}."}), 404
+
+    try:
+        start, end = [date.fromisoformat(request.args[name]) if request.args.get(name) else None
+                      for name in ('start', 'end')]
+    except ValueError:
+        return jsonify({'error': 'Invalid start or end date, expected YYYY-MM-DD.'}), 400
+    status = request.args.get('status', 'all')
+    if status != 'all' and status not in STATUSES:
+        return jsonify({'error': f"Invalid status, expected all or one of {', '.join(STATUSES)}."}), 400
+
+    statement = filter_time_window(export_statement(start, end, None if status == 'all' else status))
+    mimetype, extension = FORMATS[fmt]
+    chunks = export_chunks(db.session, statement, fmt, current_app.config['EXPORT_CHUNK_SIZE'])
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=appointments-{date.today()}.{extension}'
+    return response
+
+# Analytics Routes
+
+@bp.route('/analytics')
+@login_required
+@admin_required
+@use_replica
+def analytics():
+    """Appointments per department per week, cancellation, no-show and utilisation figures"""
+    start, end = default_range()
+    try:
+        if request.args.get('start'):
+            start = date.fromisoformat(request.args['start'])
+        if request.args.get('end'):
+            end = date.fromisoformat(request.args['end'])
+    except ValueError:
+        flash('Invalid date, expected YYYY-MM-DD.', 'danger')
+        start, end = default_range()
+
+    max_weeks = current_app.config['ANALYTICS_MAX_WEEKS']
+    if end < start:
+        flash('The end date must not be before the start date.', 'danger')
+        start, end = default_range()
+    elif (end - start).days >= max_weeks * 7:
+        flash(f'Reports cover at most {max_weeks} weeks, showing the last {max_weeks} up to {end}.', 'warning')
+        start = end - timedelta(weeks=max_weeks) + timedelta(days=1)
+
+    return render_template('admin/analytics.html', report=get_report(start, end))
 
 # Search Routes
 
 @bp.route('/search', methods=['GET', 'POST'])
 @login_required
 @admin_required
+@use_replica
 def search():
     """Search for patients and doctors"""
-    if request.method == 'POST':
-        search_type = request.form.get('search_type')
-        query = request.form.get('query')
-
-        if search_type == 'patient':
-            results = Patient.query.filter(
-                (Patient.name.ilike(f'%{query}%')) |
-                (Patient.email.ilike(f'%{query}%')) |
-                (Patient.contact.ilike(f'%{query}%'))
-            ).all()
-            return render_template('admin/search.html', results=results, search_type='patient', query=query)
-
-        elif search_type == 'doctor':
-            results = Doctor.query.join(Department).filter(
-                (Doctor.name.ilike(f'%{query}%')) |
-                (Doctor.email.ilike(f'%{query}%')) |
-                (Department.department_name.ilike(f'%{query}%'))
-            ).all()
-            return render_template('admin/search.html', results=results, search_type='doctor', query=query)
+    # The form POSTs; result pages link back with GET arguments
+    source = request.form if request.method == 'POST' else request.args
+    search_type = source.get('search_type')
+    query = (source.get('query') or '').strip()
+    page_number = request.args.get('page', 1, type=int)
+
+    if query and search_type in ('patient', 'doctor'):
+        search = search_patients if search_type == 'patient' else search_doctors
+        page = search(query, page_number, current_app.config['SEARCH_PER_PAGE'])
+        return render_template('admin/search.html', results=page.items, page=page,
+                               search_type=search_type, query=query)
 
     return render_template('admin/search.html', results=None)
+
+@bp.route('/search/suggest')
+@login_required
+@admin_required
+def search_suggest():
+    """Typeahead prefix matches for the search box as JSON"""
+    search_type = request.args.get('type', 'patient')
+    if search_type not in ('patient', 'doctor'):
+        return jsonify({'error': 'type must be patient or doctor.'}), 400
+
+    query = request.args.get('q', '')
+    suggestions = typeahead.suggest(search_type, query, typeahead.get_limit(), include_blacklisted=True)
+    for record in suggestions:
+        if search_type == 'doctor':
+            record['url'] = url_for('admin.edit_doctor', id=record['id'])
+        else:
+            record['url'] = url_for('admin.edit_patient', id=record['id'])
+    return jsonify({
+        'query': query,
+        'type': search_type,
+        'results': suggestions,
+    })
+
+@bp.route('/profiling', methods=['GET', 'DELETE'])
+@login_required
+@admin_required
+def profiling():
+    """Per-endpoint SQL profile as JSON, DELETE resets it"""
+    if request.method == 'DELETE':
+        reset_profiling()
+    return jsonify({
+        'enabled': current_app.config['SQL_PROFILING'],
+        'n_plus_one_threshold': current_app.config['SQL_PROFILING_N_PLUS_ONE'],
+        'endpoints': profiling_summary(),
+    })
@@ -3,10 +3,13 @@ Authentication routes - login, logout, registration
 """
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, current_user
+from sqlalchemy.exc import IntegrityError
 from extensions import db
-from models.admin import Admin
-from models.doctor import Doctor
 from models.patient import Patient
+from models.user_identity import UserIdentity
+from utils.stats import invalidate_stats
+from utils.passwords import needs_rehash
+from utils.metrics import LOGIN_FAILURES
 from datetime import datetime
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -28,37 +31,30 @@ def login():
         password = request.form.get('password')
 
         if not email or not password:
+            LOGIN_FAILURES.inc(reason='missing_fields')
             flash('Please provide both email and password.', 'danger')
             return redirect(url_for('auth.login'))
 
-        # Try to find user in each table
+        # One indexed lookup finds the account whatever its role
         user = None
+        identity = UserIdentity.query.filter_by(email=email).first()
+        account = identity.get_user() if identity else None
 
-        # Check admin
-        admin = Admin.query.filter_by(email=email).first()
-        if admin and admin.check_password(password):
-            if not admin.is_active:
+        if account and account.check_password(password):
+            if account.role == 'admin' and not account.is_active:
+                LOGIN_FAILURES.inc(reason='inactive')
                 flash('Your account has been deactivated.', 'danger')
                 return redirect(url_for('auth.login'))
-            user = admin
-
-        # Check doctor
-        if not user:
-            doctor = Doctor.query.filter_by(email=email).first()
-            if doctor and doctor.check_password(password):
-                if doctor.is_blacklisted:
-                    flash('Your account has been suspended.', 'danger')
-                    return redirect(url_for('auth.login'))
-                user = doctor
-
-        # Check patient
-        if not user:
-            patient = Patient.query.filter_by(email=email).first()
-            if patient and patient.check_password(password):
-                if patient.is_blacklisted:
-                    flash('Your account has been suspended.', 'danger')
-                    return redirect(url_for('auth.login'))
-                user = patient
+            if account.role != 'admin' and account.is_blacklisted:
+                LOGIN_FAILURES.inc(reason='suspended')
+                flash('Your account has been suspended.', 'danger')
+                return redirect(url_for('auth.login'))
+            user = account
+
+            # Upgrade hashes made with an outdated algorithm or cost while we have the password
+            if needs_rehash(user.password_hash):
+                user.set_password(password)
+                db.session.commit()
 
         if user:
             login_user(user, remember=True)
@@ -72,6 +68,7 @@ def login():
             elif user.role == 'patient':
                 return redirect(url_for('patient.dashboard'))
         else:
+            LOGIN_FAILURES.inc(reason='unknown_email' if account is None else 'bad_password')
             flash('Invalid email or password.', 'danger')
             return redirect(url_for('auth.login'))
 
@@ -104,16 +101,8 @@ def register():
             flash('Password must be at least 6 characters long.', 'danger')
             return redirect(url_for('auth.register'))
 
-        # Check if email already exists
-        if Patient.query.filter_by(email=email).first():
-            flash('Email already registered.', 'danger')
-            return redirect(url_for('auth.register'))
-
-        if Doctor.query.filter_by(email=email).first():
-            flash('Email already registered.', 'danger')
-            return redirect(url_for('auth.register'))
-
-        if Admin.query.filter_by(email=email).first():
+        # Check if email already exists for any role
+        if UserIdentity.query.filter_by(email=email).first():
             flash('Email already registered.', 'danger')
             return redirect(url_for('auth.register'))
 
@@ -127,7 +116,14 @@ def register():
         patient.set_password(password)
 
         db.session.add(patient)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent registration for the same email
+            db.session.rollback()
+            flash('Email already registered.', 'danger')
+            return redirect(url_for('auth.register'))
+        invalidate_stats('admin')
 
         flash('Registration successful! Please log in.', 'success')
         return redirect(url_for('auth.login'))
@@ -1,13 +1,19 @@
 """
 Doctor routes - dashboard, appointments, treatments, availability
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from extensions import db
 from models.appointment import Appointment
 from models.treatment import Treatment
 from models.doctor_availability import DoctorAvailability
 from utils.decorators import doctor_required
+from utils.replicas import use_replica
+from utils.conditional import conditional, patient_history_state
+from utils.queries import appointment_query, treatment_query, filter_time_window
+from utils.pagination import keyset_paginate, render_list
+from utils.stats import get_doctor_stats, invalidate_appointment_stats
+from utils import schedule
 from datetime import datetime, timedelta
 
 bp = Blueprint('doctor', __name__, url_prefix='/doctor')
@@ -15,67 +21,70 @@ bp = Blueprint('doctor', __name__, url_prefix='/doctor')
 @bp.route('/dashboard')
 @login_required
 @doctor_required
+@use_replica
 def dashboard():
     """Doctor dashboard with appointment overview"""
     today = datetime.now().date()
+    next_week = today + timedelta(days=7)
 
-    # Get today's appointments
-    today_appointments = Appointment.query.filter_by(
-        doctor_id=current_user.id,
-        date=today
-    ).order_by(Appointment.time).all()
+    # Counts, free slots and the next free slot all come from the schedule rows
+    days = schedule.schedule_days([current_user.id], today, next_week)[current_user.id]
+    week = [days[day] for day in sorted(days)]
+    stats = get_doctor_stats(current_user.id, days)
+    next_free = schedule.first_free_slot(week) or schedule.next_free_slot(current_user.id)
 
-    # Get upcoming appointments (next 7 days)
-    next_week = today + timedelta(days=7)
-    upcoming_appointments = Appointment.query.filter(
-        Appointment.doctor_id == current_user.id,
-        Appointment.date > today,
-        Appointment.date <= next_week
-    ).order_by(Appointment.date, Appointment.time).all()
-
-    stats = {
-        'today': len(today_appointments),
-        'upcoming': len(upcoming_appointments),
-        'pending': Appointment.query.filter_by(
+    # Appointments are only read for the patient rows shown
+    today_appointments = []
+    if stats['today']:
+        today_appointments = appointment_query().filter_by(
             doctor_id=current_user.id,
-            status='Booked'
-        ).count()
-    }
+            date=today
+        ).order_by(Appointment.time).all()
+
+    upcoming_appointments = []
+    if stats['upcoming']:
+        upcoming_appointments = appointment_query().filter(
+            Appointment.doctor_id == current_user.id,
+            Appointment.date > today,
+            Appointment.date <= next_week
+        ).order_by(Appointment.date, Appointment.time).limit(current_app.config['DASHBOARD_UPCOMING_LIMIT']).all()
 
     return render_template('doctor/dashboard.html',
                          today_appointments=today_appointments,
                          upcoming_appointments=upcoming_appointments,
-                         stats=stats)
+                         stats=stats,
+                         week=week[:7],
+                         next_free=next_free)
 
 # Appointment Management Routes
 
 @bp.route('/appointments')
 @login_required
 @doctor_required
+@use_replica
 def appointments():
     """View all appointments"""
     status_filter = request.args.get('status', 'all')
 
-    if status_filter == 'all':
-        appointments = Appointment.query.filter_by(
-            doctor_id=current_user.id
-        ).order_by(Appointment.date.desc(), Appointment.time.desc()).all()
-    else:
-        appointments = Appointment.query.filter_by(
-            doctor_id=current_user.id,
-            status=status_filter
-        ).order_by(Appointment.date.desc(), Appointment.time.desc()).all()
+    query = appointment_query().filter_by(doctor_id=current_user.id)
+    if status_filter != 'all':
+        query = query.filter_by(status=status_filter)
+    query = filter_time_window(query)
 
-    return render_template('doctor/appointments.html',
-                         appointments=appointments,
-                         status_filter=status_filter)
+    page = keyset_paginate(query, [Appointment.date, Appointment.time, Appointment.id])
+
+    return render_list('doctor/appointments.html',
+                       appointments=page.items,
+                       page=page,
+                       status_filter=status_filter)
 
 @bp.route('/appointments/view/<int:id>')
 @login_required
 @doctor_required
+@use_replica
 def view_appointment(id):
     """View detailed appointment information"""
-    appointment = Appointment.query.get_or_404(id)
+    appointment = appointment_query().filter(Appointment.id == id).first_or_404()
 
     # Ensure doctor can only view their own appointments
     if appointment.doctor_id != current_user.id:
@@ -86,7 +95,7 @@ def view_appointment(id):
     treatments = Treatment.query.filter_by(appointment_id=id).order_by(Treatment.created_at.desc()).all()
 
     # Get patient's medical history (all past treatments)
-    patient_history = Treatment.query.join(Appointment).filter(
+    patient_history = treatment_query().join(Appointment).filter(
         Appointment.patient_id == appointment.patient_id,
         Treatment.appointment_id != id
     ).order_by(Treatment.created_at.desc()).limit(5).all()
@@ -135,6 +144,7 @@ def complete_appointment(id):
 
         db.session.add(treatment)
         db.session.commit()
+        invalidate_appointment_stats(appointment)
 
         flash('Appointment completed successfully!', 'success')
         return redirect(url_for('doctor.view_appointment', id=id))
@@ -160,6 +170,7 @@ def cancel_appointment(id):
 
     appointment.status = 'Cancelled'
     db.session.commit()
+    invalidate_appointment_stats(appointment)
 
     flash('Appointment cancelled successfully.', 'success')
     return redirect(url_for('doctor.appointments'))
@@ -169,6 +180,7 @@ def cancel_appointment(id):
 @bp.route('/patients')
 @login_required
 @doctor_required
+@use_replica
 def patients():
     """View all patients with appointments"""
     # Get unique patients from appointments
@@ -186,6 +198,8 @@ def patients():
 @bp.route('/patients/history/<int:patient_id>')
 @login_required
 @doctor_required
+@use_replica
+@conditional(patient_history_state)
 def patient_history(patient_id):
     """View complete medical history for a patient"""
     from models.patient import Patient
@@ -202,13 +216,13 @@ def patient_history(patient_id):
         return redirect(url_for('doctor.patients'))
 
     # Get all appointments and treatments for this patient with current doctor
-    appointments = Appointment.query.filter_by(
+    appointments = appointment_query().filter_by(
         doctor_id=current_user.id,
         patient_id=patient_id
     ).order_by(Appointment.date.desc(), Appointment.time.desc()).all()
 
     # Get all treatments
-    treatments = Treatment.query.join(Appointment).filter(
+    treatments = treatment_query().join(Appointment).filter(
         Appointment.doctor_id == current_user.id,
         Appointment.patient_id == patient_id
     ).order_by(Treatment.created_at.desc()).all()
@@ -226,8 +240,9 @@ def patient_history(patient_id):
 def manage_availability():
     """Manage doctor's weekly availability schedule"""
     if request.method == 'POST':
-        # Delete existing availability
+        # Delete existing availability (a bulk delete fires no mapper events, so mark the schedule)
         DoctorAvailability.query.filter_by(doctor_id=current_user.id).delete()
+        schedule.mark_doctor(db.session, current_user.id)
 
         # Process form data for each day
         days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
@@ -1,14 +1,22 @@
 """
 Patient routes - dashboard, doctor search, appointment booking, medical history
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from extensions import db
 from models.doctor import Doctor
 from models.appointment import Appointment
-from models.department import Department
 from models.treatment import Treatment
 from utils.decorators import patient_required
+from utils.replicas import use_replica
+from utils.conditional import conditional, find_doctors_state, view_doctor_state, medical_history_state
+from utils.queries import appointment_query, treatment_query, filter_time_window
+from utils.pagination import keyset_paginate, render_list
+from utils.stats import get_patient_stats, invalidate_appointment_stats
+from utils.slots import earliest_free_slots, free_slots, slot_minutes
+from utils.booking import book_slot, SlotAlreadyBooked
+from utils import refdata, schedule, typeahead
+from utils.metrics import BOOKING_CONFLICTS
 from datetime import datetime, timedelta
 
 bp = Blueprint('patient', __name__, url_prefix='/patient')
@@ -16,23 +24,20 @@ bp = Blueprint('patient', __name__, url_prefix='/patient')
 @bp.route('/dashboard')
 @login_required
 @patient_required
+@use_replica
 def dashboard():
     """Patient dashboard with upcoming appointments and departments"""
     # Get all departments
-    departments = Department.query.all()
+    departments = refdata.get_departments()
 
     # Get upcoming appointments
     today = datetime.now().date()
-    upcoming_appointments = Appointment.query.filter(
+    upcoming_appointments = appointment_query().filter(
         Appointment.patient_id == current_user.id,
         Appointment.date >= today
     ).order_by(Appointment.date, Appointment.time).limit(5).all()
 
-    stats = {
-        'upcoming': len(upcoming_appointments),
-        'total_doctors': Doctor.query.filter_by(is_blacklisted=False).count(),
-        'departments': len(departments)
-    }
+    stats = get_patient_stats(current_user.id)
 
     return render_template('patient/dashboard.html',
                          departments=departments,
@@ -44,28 +49,42 @@ def dashboard():
 @bp.route('/doctors')
 @login_required
 @patient_required
+@use_replica
+@conditional(find_doctors_state)
 def find_doctors():
     """Search and find doctors"""
     specialization_id = request.args.get('specialization', type=int)
 
-    if specialization_id:
-        doctors = Doctor.query.filter_by(
-            specialization_id=specialization_id,
-            is_blacklisted=False
-        ).all()
-    else:
-        doctors = Doctor.query.filter_by(is_blacklisted=False).all()
-
-    departments = Department.query.all()
+    doctors = refdata.get_doctor_directory(specialization_id or None)
+    departments = refdata.get_departments()
 
     return render_template('patient/find_doctors.html',
                          doctors=doctors,
                          departments=departments,
                          selected_specialization=specialization_id)
 
+@bp.route('/doctors/suggest')
+@login_required
+@patient_required
+def suggest_doctors():
+    """Typeahead matches on doctor name, email or department as JSON"""
+    query = request.args.get('q', '')
+    suggestions = typeahead.suggest('doctor', query, typeahead.get_limit())
+    return jsonify({
+        'query': query,
+        'results': [{
+            'id': record['id'],
+            'name': record['name'],
+            'department': record['department'],
+            'url': url_for('patient.view_doctor', doctor_id=record['id']),
+        } for record in suggestions],
+    })
+
 @bp.route('/doctors/<int:doctor_id>')
 @login_required
 @patient_required
+@use_replica
+@conditional(view_doctor_state)
 def view_doctor(doctor_id):
     """View doctor profile and availability"""
     doctor = Doctor.query.get_or_404(doctor_id)
@@ -82,28 +101,103 @@ def view_doctor(doctor_id):
                          doctor=doctor,
                          availability=availability)
 
+@bp.route('/doctors/<int:doctor_id>/slots')
+@login_required
+@patient_required
+def doctor_slots(doctor_id):
+    """Free appointment slots for a doctor as JSON"""
+    doctor = Doctor.query.get_or_404(doctor_id)
+
+    if doctor.is_blacklisted:
+        return jsonify({'error': 'This doctor is not available.'}), 404
+
+    today = datetime.now().date()
+    start = request.args.get('start')
+    try:
+        start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else today + timedelta(days=1)
+    except ValueError:
+        return jsonify({'error': 'Invalid start date, expected YYYY-MM-DD.'}), 400
+    start_date = max(start_date, today)
+
+    days = request.args.get('days', 7, type=int)
+    days = max(1, min(days, current_app.config['SLOT_SEARCH_MAX_DAYS']))
+    end_date = start_date + timedelta(days=days - 1)
+
+    slots = free_slots(doctor_id, start_date, end_date)
+
+    return jsonify({
+        'doctor_id': doctor_id,
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'slot_minutes': slot_minutes(),
+        'slots': {
+            day.isoformat(): [slot.strftime('%H:%M') for slot in times]
+            for day, times in sorted(slots.items())
+        }
+    })
+
+@bp.route('/doctors/earliest')
+@login_required
+@patient_required
+@use_replica
+def earliest_slots():
+    """The soonest free slots across a department's doctors as JSON"""
+    department_id = request.args.get('department', type=int)
+    if not any(department['id'] == department_id for department in refdata.get_departments()):
+        return jsonify({'error': 'Unknown department.'}), 404
+
+    today = datetime.now().date()
+    start = request.args.get('start')
+    try:
+        start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else today + timedelta(days=1)
+    except ValueError:
+        return jsonify({'error': 'Invalid start date, expected YYYY-MM-DD.'}), 400
+    start_date = max(start_date, today)
+
+    days = request.args.get('days', 7, type=int)
+    days = max(1, min(days, current_app.config['SLOT_SEARCH_MAX_DAYS']))
+    end_date = start_date + timedelta(days=days - 1)
+    limit = request.args.get('n', 10, type=int)
+    limit = max(1, min(limit, current_app.config['EARLIEST_SLOTS_MAX']))
+
+    doctors = {doctor['id']: doctor for doctor in refdata.get_doctor_directory(department_id)}
+    slots = earliest_free_slots(doctors, start_date, end_date, limit)
+
+    return jsonify({
+        'department_id': department_id,
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'slot_minutes': slot_minutes(),
+        'slots': [{
+            'doctor_id': doctor_id,
+            'doctor_name': doctors[doctor_id]['name'],
+            'date': moment.date().isoformat(),
+            'time': moment.strftime('%H:%M'),
+            'book_url': url_for('patient.book_appointment', doctor_id=doctor_id),
+        } for moment, doctor_id in slots],
+    })
+
 # Appointment Management Routes
 
 @bp.route('/appointments')
 @login_required
 @patient_required
+@use_replica
 def appointments():
     """View all appointments"""
     status_filter = request.args.get('status', 'all')
 
-    if status_filter == 'all':
-        appointments = Appointment.query.filter_by(
-            patient_id=current_user.id
-        ).order_by(Appointment.date.desc(), Appointment.time.desc()).all()
-    else:
-        appointments = Appointment.query.filter_by(
-            patient_id=current_user.id,
-            status=status_filter
-        ).order_by(Appointment.date.desc(), Appointment.time.desc()).all()
-
-    return render_template('patient/appointments.html',
-                         appointments=appointments,
-                         status_filter=status_filter)
+    query = appointment_query().filter_by(patient_id=current_user.id)
+    if status_filter != 'all':
+        query = query.filter_by(status=status_filter)
+    query = filter_time_window(query)
+
+    page = keyset_paginate(query, [Appointment.date, Appointment.time, Appointment.id])
+
+    return render_list('patient/appointments.html',
+                       appointments=page.items,
+                       page=page,
+                       status_filter=status_filter)
 
 @bp.route('/appointments/book/<int:doctor_id>', methods=['GET', 'POST'])
 @login_required
@@ -133,45 +227,29 @@ def book_appointment(doctor_id):
             flash('Cannot book appointments in the past.', 'danger')
             return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
 
-        # Validation: Check for conflicting appointments
-        existing = Appointment.query.filter_by(
-            doctor_id=doctor_id,
-            date=apt_date,
-            time=apt_time
-        ).filter(Appointment.status != 'Cancelled').first()
+        # Validation: one read of the doctor's schedule day covers availability and conflicts
+        day = schedule.get_day(doctor_id, apt_date)
+        if not day['capacity']:
+            flash(f'Doctor is not available on {apt_date.strftime("%A")}s.', 'danger')
+            return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
 
-        if existing:
+        if apt_time in schedule.parse_slots(day['booked_slots']):
+            BOOKING_CONFLICTS.inc(stage='precheck')
             flash('This time slot is already booked. Please choose another time.', 'danger')
             return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
 
-        # Validation: Check doctor availability
-        from models.doctor_availability import DoctorAvailability
-        day_name = apt_date.strftime('%A')
-        availability = DoctorAvailability.query.filter_by(
-            doctor_id=doctor_id,
-            day_of_week=day_name
-        ).first()
-
-        if not availability:
-            flash(f'Doctor is not available on {day_name}s.', 'danger')
+        if apt_time not in schedule.parse_slots(day['free_slots']):
+            flash('Selected time is not one of the doctor\'s appointment slots.', 'danger')
             return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
 
-        if not (availability.start_time <= apt_time <= availability.end_time):
-            flash('Selected time is outside doctor\'s available hours.', 'danger')
+        # Create appointment - the unique slot index rejects concurrent double bookings
+        try:
+            book_slot(current_user.id, doctor_id, apt_date, apt_time)
+        except SlotAlreadyBooked:
+            BOOKING_CONFLICTS.inc(stage='insert')
+            flash('This time slot was just booked by someone else. Please choose another time.', 'danger')
             return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
 
-        # Create appointment
-        appointment = Appointment(
-            patient_id=current_user.id,
-            doctor_id=doctor_id,
-            date=apt_date,
-            time=apt_time,
-            status='Booked'
-        )
-
-        db.session.add(appointment)
-        db.session.commit()
-
         flash(f'Appointment booked successfully with Dr. {doctor.name} on {apt_date} at {apt_time.strftime("%I:%M %p")}!', 'success')
         return redirect(url_for('patient.appointments'))
 
@@ -210,6 +288,7 @@ def cancel_appointment(id):
 
     appointment.status = 'Cancelled'
     db.session.commit()
+    invalidate_appointment_stats(appointment)
 
     flash('Appointment cancelled successfully.', 'success')
     return redirect(url_for('patient.appointments'))
@@ -219,15 +298,17 @@ def cancel_appointment(id):
 @bp.route('/history')
 @login_required
 @patient_required
+@use_replica
+@conditional(medical_history_state)
 def medical_history():
     """View complete medical history"""
     # Get all completed appointments with treatments
-    appointments = Appointment.query.filter_by(
+    appointments = appointment_query().filter_by(
         patient_id=current_user.id
     ).order_by(Appointment.date.desc(), Appointment.time.desc()).all()
 
     # Get all treatments
-    treatments = Treatment.query.join(Appointment).filter(
+    treatments = treatment_query().join(Appointment).filter(
         Appointment.patient_id == current_user.id
     ).order_by(Treatment.created_at.desc()).all()
 
@@ -0,0 +1,255 @@
+"""
+Synthetic data generator
+Bulk-loads a production-sized data set on top of an initialised database:
+departments, doctors with weekly availability, patients, appointments spread
+over a date window and treatments for completed visits. Popular doctors and
+frequent patients follow skewed distributions, past appointments are mostly
+completed and future ones mostly booked. Every generated account shares one
+password, hashed once.
+
+Usage:
+    python seed_data.py --doctors 200 --patients 50000 --appointments 500000
+    python seed_data.py --reset --appointments 1000000
+"""
+import argparse
+import random
+import time as timer
+from datetime import date, datetime, time, timedelta
+from extensions import db
+from models.department import Department
+from models.doctor import Doctor
+from models.doctor_availability import DoctorAvailability
+from models.patient import Patient
+from models.appointment import Appointment
+from models.treatment import Treatment
+from models.user_identity import UserIdentity
+from utils.passwords import hash_password
+from utils.search import rebuild_search_index
+from utils.schedule import rebuild as rebuild_schedule
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen',
+               'Priya', 'Wei', 'Aisha', 'Carlos', 'Fatima', 'Hiroshi', 'Olga', 'Kwame', 'Ana', 'Mohammed']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+              'Patel', 'Chen', 'Kim', 'Nguyen', 'Okafor', 'Ivanova', 'Tanaka', 'Silva', 'Khan', 'Mensah']
+DEPARTMENTS = ['General Medicine', 'Cardiology', 'Orthopedics', 'Pediatrics', 'Dermatology', 'Neurology',
+               'Gynecology', 'Ophthalmology', 'ENT', 'Psychiatry', 'Oncology', 'Urology', 'Gastroenterology',
+               'Endocrinology', 'Pulmonology', 'Nephrology', 'Rheumatology', 'Radiology']
+DIAGNOSES = ['Common cold', 'Hypertension', 'Type 2 diabetes', 'Lower back pain', 'Migraine', 'Seasonal allergies',
+             'Gastritis', 'Eczema', 'Sprained ankle', 'Anxiety', 'Bronchitis', 'Conjunctivitis', 'Otitis media',
+             'Urinary tract infection', 'Iron deficiency anaemia', 'Routine check-up, no findings']
+PRESCRIPTIONS = ['Paracetamol 500mg as needed', 'Amlodipine 5mg daily', 'Metformin 500mg twice daily',
+                 'Ibuprofen 400mg three times daily', 'Cetirizine 10mg daily', 'Omeprazole 20mg daily',
+                 'Hydrocortisone cream 1%', 'Amoxicillin 500mg three times daily for 7 days', None]
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Synthetic accounts use this domain so their emails never clash with real ones
+EMAIL_DOMAIN = 'seed.example.com'
+
+def _insert(model, rows, batch_size):
+    """Core bulk insert in batches, bypassing per-object ORM work"""
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(db.insert(model), rows[start:start + batch_size])
+
+def _max_id(model):
+    return db.session.query(db.func.coalesce(db.func.max(model.id), 0)).scalar()
+
+def _working_hours(rng):
+    """A doctor's weekly schedule as {weekday index: (start, end)}"""
+    days = rng.sample(range(5), rng.choice([3, 4, 4, 5, 5, 5]))
+    if rng.random() < 0.2:
+        days.append(5)
+    start = rng.choice([8, 8, 9, 9, 9, 10, 13])
+    end = min(start + rng.choice([4, 6, 8, 8, 9]), 20)
+    return {day: (time(start), time(end)) for day in days}
+
+def seed(departments=12, doctors=50, patients=5000, appointments=50000, days_back=365, days_ahead=30,
+         slot_minutes=60, password='password123', batch_size=10000, random_seed=42, log=print):
+    """
+    Generate a synthetic data set inside the current app context
+    Returns the number of rows created per table.
+    """
+    rng = random.Random(random_seed)
+    today = date.today()
+    password_hash = hash_password(password)
+    run = f'{random_seed}-{int(timer.time())}'
+    counts = {}
+
+    # Departments: reuse existing names, add the missing ones
+    existing = {name for (name,) in db.session.query(Department.department_name)}
+    names = DEPARTMENTS[:departments] + [f'Clinic {i}' for i in range(len(DEPARTMENTS), departments)]
+    new_departments = [{'department_name': name, 'description': f'{name} department'}
+                       for name in names if name not in existing]
+    _insert(Department, new_departments, batch_size)
+    department_ids = [row.id for row in db.session.query(Department.id).filter(Department.department_name.in_(names))]
+    counts['departments'] = len(new_departments)
+
+    # Doctors: a few large departments, a long tail of small ones
+    log(f'Doctors: {doctors}')
+    first_doctor = _max_id(Doctor) + 1
+    department_weights = [1 / (rank + 1) for rank in range(len(department_ids))]
+    doctor_rows = []
+    for i in range(doctors):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        doctor_rows.append({
+            'name': f'Dr. {first} {last}',
+            'email': f'{first.lower()}.{last.lower()}.d{i}.{run}@{EMAIL_DOMAIN}',
+            'password_hash': password_hash,
+            'specialization_id': rng.choices(department_ids, department_weights)[0],
+            'contact': f'555-{rng.randint(0, 9999):04d}',
+            'is_blacklisted': rng.random() < 0.02,
+        })
+    _insert(Doctor, doctor_rows, batch_size)
+    doctor_ids = [row.id for row in db.session.query(Doctor.id).filter(Doctor.id >= first_doctor).order_by(Doctor.id)]
+    counts['doctors'] = len(doctor_ids)
+
+    schedules = {doctor_id: _working_hours(rng) for doctor_id in doctor_ids}
+    _insert(DoctorAvailability, [
+        {'doctor_id': doctor_id, 'day_of_week': WEEKDAYS[day], 'start_time': start, 'end_time': end}
+        for doctor_id, hours in schedules.items() for day, (start, end) in hours.items()
+    ], batch_size)
+    counts['doctor_availability'] = sum(len(hours) for hours in schedules.values())
+
+    # Patients: ages skewed towards adults, signups spread over two years
+    log(f'Patients: {patients}')
+    first_patient = _max_id(Patient) + 1
+    patient_rows = []
+    for i in range(patients):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        age = min(int(rng.gammavariate(4, 10)), 100)
+        patient_rows.append({
+            'name': f'{first} {last}',
+            'email': f'{first.lower()}.{last.lower()}.p{i}.{run}@{EMAIL_DOMAIN}',
+            'password_hash': password_hash,
+            'contact': f'555-{rng.randint(0, 9999):04d}',
+            'date_of_birth': today - timedelta(days=age * 365 + rng.randint(0, 364)),
+            'is_blacklisted': rng.random() < 0.01,
+            'created_at': datetime.utcnow() - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+        })
+        if len(patient_rows) == batch_size:
+            _insert(Patient, patient_rows, batch_size)
+            patient_rows = []
+    _insert(Patient, patient_rows, batch_size)
+    patient_ids = [row.id for row in db.session.query(Patient.id).filter(Patient.id >= first_patient).order_by(Patient.id)]
+    counts['patients'] = len(patient_ids)
+
+    # Login lookups go through user_identities, which Core inserts do not maintain
+    _insert(UserIdentity, [
+        {'email': row.email, 'role': 'doctor', 'user_id': row.id}
+        for row in db.session.query(Doctor.id, Doctor.email).filter(Doctor.id >= first_doctor)
+    ] + [
+        {'email': row.email, 'role': 'patient', 'user_id': row.id}
+        for row in db.session.query(Patient.id, Patient.email).filter(Patient.id >= first_patient)
+    ], batch_size)
+
+    # Appointments: popular doctors and frequent patients, one per free slot
+    log(f'Appointments: {appointments}')
+    first_appointment = _max_id(Appointment) + 1
+    doctor_weights = [rng.lognormvariate(0, 0.75) for _ in doctor_ids]
+    patient_weights = [rng.paretovariate(1.5) for _ in patient_ids]
+    window = days_back + days_ahead + 1
+    taken = set()
+    rows, created, skipped = [], 0, 0
+    doctors_sample = rng.choices(doctor_ids, doctor_weights, k=appointments) if doctor_ids else []
+    patients_sample = rng.choices(patient_ids, patient_weights, k=appointments) if patient_ids else []
+
+    for doctor_id, patient_id in zip(doctors_sample, patients_sample):
+        hours = schedules[doctor_id]
+        for _ in range(20):
+            day = today + timedelta(days=rng.randrange(window) - days_back)
+            if day.weekday() not in hours:
+                continue
+            start, end = hours[day.weekday()]
+            slots = (end.hour - start.hour) * 60 // slot_minutes
+            minutes = start.hour * 60 + rng.randrange(slots) * slot_minutes
+            slot = (doctor_id, day, minutes)
+            if slot not in taken:
+                break
+        else:
+            skipped += 1
+            continue
+        taken.add(slot)
+
+        roll = rng.random()
+        if day < today:
+            status = 'Completed' if roll < 0.8 else 'Cancelled' if roll < 0.92 else 'Booked'
+        else:
+            status = 'Cancelled' if roll < 0.12 else 'Booked'
+        booked_at = datetime.combine(day, time()) - timedelta(hours=rng.randint(2, 24 * 45))
+        rows.append({
+            'patient_id': patient_id,
+            'doctor_id': doctor_id,
+            'date': day,
+            'time': time(minutes // 60, minutes % 60),
+            'status': status,
+            'created_at': booked_at,
+            'updated_at': booked_at,
+        })
+        if len(rows) == batch_size:
+            _insert(Appointment, rows, batch_size)
+            created += len(rows)
+            rows = []
+    _insert(Appointment, rows, batch_size)
+    created += len(rows)
+    counts['appointments'] = created
+    if skipped:
+        log(f'  {skipped} skipped, no free slot found for the chosen doctor (add doctors or widen the window)')
+
+    # Treatments for completed visits
+    log('Treatments')
+    treatment_rows, treatments = [], 0
+    completed = db.session.execute(
+        db.select(Appointment.id, Appointment.date, Appointment.time).where(
+            Appointment.id >= first_appointment, Appointment.status == 'Completed'
+        ).execution_options(yield_per=batch_size)
+    )
+    for row in completed:
+        treatment_rows.append({
+            'appointment_id': row.id,
+            'diagnosis': rng.choice(DIAGNOSES),
+            'prescription': rng.choice(PRESCRIPTIONS),
+            'notes': 'Follow up in two weeks' if rng.random() < 0.3 else None,
+            'created_at': datetime.combine(row.date, row.time) + timedelta(minutes=rng.randint(10, 50)),
+        })
+        if len(treatment_rows) == batch_size:
+            _insert(Treatment, treatment_rows, batch_size)
+            treatments += len(treatment_rows)
+            treatment_rows = []
+    _insert(Treatment, treatment_rows, batch_size)
+    counts['treatments'] = treatments + len(treatment_rows)
+
+    log('Search index')
+    rebuild_search_index(db.session.connection())
+    log('Doctor schedule')
+    counts['doctor_schedule_days'] = rebuild_schedule()
+    db.session.commit()
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reset', action='store_true', help='recreate the database with init_db first')
+    parser.add_argument('--departments', type=int, default=12)
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--appointments', type=int, default=50000)
+    parser.add_argument('--days-back', type=int, default=365)
+    parser.add_argument('--days-ahead', type=int, default=30)
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import app
+    if args.reset:
+        from init_db import init_database
+        init_database()
+
+    with app.app_context():
+        started = timer.perf_counter()
+        counts = seed(args.departments, args.doctors, args.patients, args.appointments,
+                      args.days_back, args.days_ahead, app.config['APPOINTMENT_SLOT_MINUTES'],
+                      args.password, random_seed=args.seed)
+        print(f'\n[SUCCESS] Seeded in {timer.perf_counter() - started:.1f}s')
+        for table, count in counts.items():
+            print(f'  {table}: {count}')
+        print(f'\nGenerated accounts use @{EMAIL_DOMAIN} emails and password: {args.password}')
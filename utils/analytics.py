@@ -0,0 +1,157 @@
+"""
+Admin reporting engine
+Every report comes from one pass over appointments: a single query in which
+the database counts totals, completions, cancellations and no-shows per
+doctor and day straight off the (doctor_id, date, status) index, then sums
+those days into weeks. Only that narrow aggregate result (doctors x weeks
+rows) reaches Python, where it is folded into departments, doctors and
+weeks; appointment rows are never loaded, let alone as ORM objects. Doctor
+names and weekly availability come from two small queries.
+
+A no-show is an appointment still Booked after its date, i.e. neither
+completed nor cancelled. Utilisation compares held slots (everything not
+cancelled) with the slots the doctor's current weekly availability offered
+over the same days.
+"""
+from datetime import date, timedelta
+from sqlalchemy import Date, case, cast, func, select
+from config import Config
+from extensions import db
+from models.appointment import Appointment
+from models.department import Department
+from models.doctor import Doctor
+from models.doctor_availability import DoctorAvailability
+from utils.cache import TTLCache
+from utils.slots import generate_slots, slot_minutes
+
+_cache = TTLCache(ttl=Config.ANALYTICS_CACHE_TTL, maxsize=64)
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def week_start(day):
+    """Monday of the day's week"""
+    return day - timedelta(days=day.weekday())
+
+def default_range(today=None, weeks=12):
+    """The last `weeks` weeks up to today, starting on a Monday"""
+    today = today or date.today()
+    return week_start(today) - timedelta(weeks=weeks - 1), today
+
+def _sql_week_start(column):
+    """Monday of the column's week, computed in SQL"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return func.date(column, 'weekday 0', '-6 days', type_=Date)
+    if dialect == 'postgresql':
+        return cast(func.date_trunc('week', column), Date)
+    if dialect in ('mysql', 'mariadb'):
+        return func.subdate(column, func.weekday(column), type_=Date)
+    raise RuntimeError(f'No week bucket defined for {dialect}')
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def _ratio(part, whole):
+    return part / whole if whole else None
+
+def _weekday_counts(start, end):
+    """{day name: number of such days from start to end}"""
+    counts = dict.fromkeys(DAY_NAMES, 0)
+    days = (end - start).days + 1
+    full_weeks, remainder = divmod(days, 7)
+    for offset in range(7):
+        name = DAY_NAMES[(start.weekday() + offset) % 7]
+        counts[name] = full_weeks + (1 if offset < remainder else 0)
+    return counts
+
+def build_report(start, end, today=None):
+    """
+    Department, doctor and weekly figures for appointments from start to end (inclusive)
+    Returns a dict with the week starts and three sections:
+        departments  per-department appointment counts per week
+        doctors      per-doctor counts, cancellation and no-show rates, utilisation
+        weekly       per-week totals, no-shows and no-show rate
+    """
+    today = today or date.today()
+    first_week = week_start(start)
+    weeks = [first_week + timedelta(weeks=i) for i in range((end - first_week).days // 7 + 1)]
+
+    # The one pass over appointments: per doctor and day off the covering
+    # (doctor_id, date, status) index, then per week over those day rows
+    status = Appointment.status
+    days = (
+        select(
+            Appointment.doctor_id, Appointment.date.label('day'), func.count().label('total'),
+            _count_if(status == 'Completed').label('completed'),
+            _count_if(status == 'Cancelled').label('cancelled'),
+            _count_if((status == 'Booked') & (Appointment.date < today)).label('no_shows')
+        ).where(Appointment.date >= start, Appointment.date <= end)
+        .group_by(Appointment.doctor_id, Appointment.date)
+    ).subquery()
+    week = _sql_week_start(days.c.day).label('week')
+    counts = db.session.execute(
+        select(days.c.doctor_id, week, func.sum(days.c.total), func.sum(days.c.completed),
+               func.sum(days.c.cancelled), func.sum(days.c.no_shows))
+        .group_by(days.c.doctor_id, week)
+    ).all()
+
+    doctors = {
+        row.id: {'id': row.id, 'name': row.name, 'department': row.department or 'Unassigned',
+                 'appointments': 0, 'completed': 0, 'cancelled': 0, 'no_shows': 0, 'capacity': 0}
+        for row in db.session.execute(
+            select(Doctor.id, Doctor.name, Department.department_name.label('department'))
+            .outerjoin(Department, Department.id == Doctor.specialization_id)
+        )
+    }
+    departments = {}
+    weekly = [{'week': day, 'appointments': 0, 'completed': 0, 'cancelled': 0, 'no_shows': 0} for day in weeks]
+
+    for doctor_id, week_day, total, completed, cancelled, no_shows in counts:
+        doctor = doctors.get(doctor_id)
+        if doctor is None:
+            continue
+        doctor['appointments'] += total
+        doctor['completed'] += completed
+        doctor['cancelled'] += cancelled
+        doctor['no_shows'] += no_shows
+        index = (week_day - first_week).days // 7
+        departments.setdefault(doctor['department'], [0] * len(weeks))[index] += total
+        totals = weekly[index]
+        totals['appointments'] += total
+        totals['completed'] += completed
+        totals['cancelled'] += cancelled
+        totals['no_shows'] += no_shows
+
+    # Offered slots: each weekly window times how often its weekday falls in the range
+    minutes = slot_minutes()
+    weekdays = _weekday_counts(start, end)
+    for availability in db.session.execute(
+        select(DoctorAvailability.doctor_id, DoctorAvailability.day_of_week,
+               DoctorAvailability.start_time, DoctorAvailability.end_time)
+    ):
+        if availability.doctor_id in doctors:
+            doctors[availability.doctor_id]['capacity'] += (
+                len(generate_slots(availability, minutes)) * weekdays.get(availability.day_of_week, 0)
+            )
+
+    for doctor in doctors.values():
+        doctor['cancellation_rate'] = _ratio(doctor['cancelled'], doctor['appointments'])
+        doctor['no_show_rate'] = _ratio(doctor['no_shows'], doctor['completed'] + doctor['no_shows'])
+        doctor['utilisation'] = _ratio(doctor['appointments'] - doctor['cancelled'], doctor['capacity'])
+    for totals in weekly:
+        totals['no_show_rate'] = _ratio(totals['no_shows'], totals['completed'] + totals['no_shows'])
+
+    return {
+        'start': start,
+        'end': end,
+        'weeks': weeks,
+        'departments': sorted(({'name': name, 'weekly': values, 'total': sum(values)}
+                               for name, values in departments.items()), key=lambda item: -item['total']),
+        'doctors': sorted(doctors.values(), key=lambda item: (-item['appointments'], item['name'])),
+        'weekly': weekly,
+    }
+
+def get_report(start, end):
+    """build_report cached for ANALYTICS_CACHE_TTL seconds per range"""
+    today = date.today()
+    return _cache.get_or_set((start, end, today), lambda: build_report(start, end, today))
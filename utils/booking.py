@@ -0,0 +1,48 @@
+"""
+Appointment booking
+The uq_appointments_doctor_slot_active index is the source of truth for
+conflicts; the read-side check in the route is only a fast path. The index is
+partial, so it only exists on SQLite and PostgreSQL; on other databases the
+read-side check is all there is.
+"""
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models.appointment import Appointment
+from utils.stats import invalidate_appointment_stats
+
+SLOT_INDEX = 'uq_appointments_doctor_slot_active'
+# SQLite reports the index's columns rather than its name
+SQLITE_SLOT_MESSAGE = 'UNIQUE constraint failed: appointments.doctor_id, appointments.date, appointments.time'
+
+class SlotAlreadyBooked(Exception):
+    """Raised when another active appointment already holds the slot"""
+
+def is_slot_conflict(error):
+    """Whether an IntegrityError is a violation of the active-slot index"""
+    message = str(error.orig)
+    return SLOT_INDEX in message or SQLITE_SLOT_MESSAGE in message
+
+def book_slot(patient_id, doctor_id, apt_date, apt_time):
+    """
+    Insert a Booked appointment, relying on the database to reject double bookings
+    Raises SlotAlreadyBooked if a concurrent booking won the slot.
+    """
+    appointment = Appointment(
+        patient_id=patient_id,
+        doctor_id=doctor_id,
+        date=apt_date,
+        time=apt_time,
+        status='Booked'
+    )
+    db.session.add(appointment)
+
+    try:
+        db.session.commit()
+    except IntegrityError as error:
+        db.session.rollback()
+        if is_slot_conflict(error):
+            raise SlotAlreadyBooked()
+        raise
+
+    invalidate_appointment_stats(appointment)
+    return appointment
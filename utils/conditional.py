@@ -0,0 +1,137 @@
+"""
+Conditional GET for history and directory pages
+A view decorated with @conditional(state) first runs state(**view_args), one
+aggregate query returning the row counts and latest created_at/updated_at
+stamps of everything the page shows. The page gets a weak ETag hashed from
+that state (plus the user, URL and templates) and a Last-Modified of the
+newest stamp. Pages rendered from the reference data cache use a fingerprint
+of the cached data instead, so the validator always matches the body. When the browser's If-None-Match or If-Modified-Since still
+matches, the view is skipped and 304 Not Modified is returned without
+loading ORM objects or rendering. Counts catch deletions, which leave no
+timestamp behind.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import func, select
+from extensions import db
+from models.appointment import Appointment
+from models.department import Department
+from models.doctor import Doctor
+from models.doctor_availability import DoctorAvailability
+from models.patient import Patient
+from models.treatment import Treatment
+from utils import refdata
+
+_TEMPLATES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+def _templates_version():
+    """Newest template mtime, so a deploy with changed templates changes every ETag"""
+    return max((os.stat(os.path.join(root, name)).st_mtime_ns
+                for root, _, names in os.walk(_TEMPLATES) for name in names), default=0)
+
+_TEMPLATES_VERSION = _templates_version()
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+def _latest(column, *criteria):
+    return select(func.max(column)).where(*criteria).scalar_subquery()
+
+def _state(*columns):
+    return tuple(db.session.execute(select(*columns)).one())
+
+# Page states
+
+def find_doctors_state():
+    # The page is rendered from refdata, which other workers may hold for up to REFDATA_CACHE_TTL
+    return (refdata.fingerprint('doctors', 'departments'),)
+
+def view_doctor_state(doctor_id):
+    doctor = db.session.execute(
+        select(Doctor.is_blacklisted, Doctor.updated_at).where(Doctor.id == doctor_id)
+    ).first()
+    if doctor is None or doctor.is_blacklisted:
+        return None
+    return (doctor.updated_at,) + _state(
+        _count(DoctorAvailability, DoctorAvailability.doctor_id == doctor_id),
+        _latest(DoctorAvailability.created_at, DoctorAvailability.doctor_id == doctor_id),
+        _latest(Department.updated_at)
+    )
+
+def _history_state(*criteria):
+    treated = Treatment.appointment_id.in_(select(Appointment.id).where(*criteria))
+    return _state(
+        _count(Appointment, *criteria), _latest(Appointment.updated_at, *criteria),
+        _count(Treatment, treated), _latest(Treatment.updated_at, treated),
+        _latest(Doctor.updated_at, Doctor.id.in_(select(Appointment.doctor_id).where(*criteria))),
+        _latest(Department.updated_at)
+    )
+
+def medical_history_state():
+    return _history_state(Appointment.patient_id == current_user.id)
+
+def patient_history_state(patient_id):
+    state = _history_state(Appointment.doctor_id == current_user.id, Appointment.patient_id == patient_id)
+    if not state[0]:
+        # No shared appointments: let the view deny access
+        return None
+    return state + _state(_latest(Patient.updated_at, Patient.id == patient_id))
+
+# Decorator
+
+def _validators(state):
+    key = repr((_TEMPLATES_VERSION, request.full_path, current_user.get_id(),
+                getattr(current_user, 'name', None), state))
+    etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+    stamps = [value for value in state if isinstance(value, datetime)]
+    last_modified = max(stamps).replace(tzinfo=timezone.utc, microsecond=0) if stamps else None
+    return etag, last_modified
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+def conditional(state):
+    """
+    Answer repeat GETs with 304 Not Modified while the page's state is unchanged
+    state(**view_args) returns a tuple of counts and timestamps, or None to
+    always run the view. Place it below @use_replica so both read the same database.
+    Usage:
+        @bp.route('/history')
+        @login_required
+        @patient_required
+        @use_replica
+        @conditional(medical_history_state)
+        def medical_history(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Pending flash messages are part of the page
+            if not current_app.config['CONDITIONAL_GET'] or '_flashes' in session:
+                return f(*args, **kwargs)
+            page_state = state(*args, **kwargs)
+            if page_state is None:
+                return f(*args, **kwargs)
+
+            etag, last_modified = _validators(page_state)
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,42 @@
+"""
+Engine tuning applied at startup
+SQLite connections get the SQLITE_* pragmas from Config on connect: WAL lets
+readers run alongside the single writer, synchronous=NORMAL is durable in WAL
+mode with far fewer fsyncs, busy_timeout makes a blocked writer wait instead
+of failing with "database is locked", and mmap_size serves reads from the page
+cache. Pool sizing for every backend comes from SQLALCHEMY_ENGINE_OPTIONS.
+"""
+from sqlalchemy import event
+from extensions import db
+
+def sqlite_pragmas(config):
+    """PRAGMA statements for a new SQLite connection"""
+    pragmas = []
+    if config['SQLITE_JOURNAL_MODE']:
+        pragmas.append(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+    if config['SQLITE_SYNCHRONOUS']:
+        pragmas.append(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+    pragmas.append(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+    if config['SQLITE_MMAP_SIZE']:
+        pragmas.append(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+    return pragmas
+
+def _listen_sqlite(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def init_engines(app):
+    """Install connect hooks on the app's SQLite engines, before any connection is made"""
+    if not app.config['SQLITE_PRAGMAS']:
+        return
+    pragmas = sqlite_pragmas(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                _listen_sqlite(engine, pragmas)
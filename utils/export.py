@@ -0,0 +1,115 @@
+"""
+Streaming export of appointments with their patient, doctor and treatment
+One Core SELECT is read with yield_per, so rows arrive from the database in
+partitions of EXPORT_CHUNK_SIZE and each partition is encoded and handed on
+before the next is fetched. Memory stays flat however many rows match.
+
+Formats:
+    csv       header row, then one line per appointment
+    ndjson    one JSON object per appointment
+    columnar  Parquet-style row groups without a Parquet dependency: a schema
+              line, then one JSON line per partition holding an array per column
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from sqlalchemy import select
+from models.appointment import Appointment
+from models.department import Department
+from models.doctor import Doctor
+from models.patient import Patient
+from models.treatment import Treatment
+
+# Format name -> (mimetype, file extension)
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'columnar': ('application/x-ndjson', 'columnar.ndjson'),
+}
+
+COLUMNS = [
+    ('appointment_id', Appointment.id, 'integer'),
+    ('date', Appointment.date, 'date'),
+    ('time', Appointment.time, 'time'),
+    ('status', Appointment.status, 'string'),
+    ('patient_id', Patient.id, 'integer'),
+    ('patient_name', Patient.name, 'string'),
+    ('patient_email', Patient.email, 'string'),
+    ('doctor_id', Doctor.id, 'integer'),
+    ('doctor_name', Doctor.name, 'string'),
+    ('doctor_email', Doctor.email, 'string'),
+    ('department', Department.department_name, 'string'),
+    ('booked_at', Appointment.created_at, 'timestamp'),
+    ('updated_at', Appointment.updated_at, 'timestamp'),
+    ('diagnosis', Treatment.diagnosis, 'string'),
+    ('prescription', Treatment.prescription, 'string'),
+    ('notes', Treatment.notes, 'string'),
+    ('treated_at', Treatment.created_at, 'timestamp'),
+]
+
+def export_statement(start=None, end=None, status=None):
+    """Appointments between start and end (inclusive dates) with the given status, in date order"""
+    statement = (
+        select(*[column.label(name) for name, column, _ in COLUMNS])
+        .join(Patient, Patient.id == Appointment.patient_id)
+        .join(Doctor, Doctor.id == Appointment.doctor_id)
+        .outerjoin(Department, Department.id == Doctor.specialization_id)
+        .outerjoin(Treatment, Treatment.appointment_id == Appointment.id)
+        .order_by(Appointment.date, Appointment.time, Appointment.id)
+    )
+    if start:
+        statement = statement.where(Appointment.date >= start)
+    if end:
+        statement = statement.where(Appointment.date <= end)
+    if status:
+        statement = statement.where(Appointment.status == status)
+    return statement
+
+def _json_value(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+def _csv(partitions):
+    names = [name for name, _, _ in COLUMNS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _ndjson(partitions):
+    names = [name for name, _, _ in COLUMNS]
+    for rows in partitions:
+        yield ''.join(json.dumps(dict(zip(names, map(_json_value, row)))) + '\n' for row in rows)
+
+def _columnar(partitions):
+    yield json.dumps({'schema': [{'name': name, 'type': kind} for name, _, kind in COLUMNS]}) + '\n'
+    for row_group, rows in enumerate(partitions):
+        columns = zip(*rows)
+        yield json.dumps({
+            'row_group': row_group,
+            'num_rows': len(rows),
+            'columns': {name: [_json_value(value) for value in values]
+                        for (name, _, _), values in zip(COLUMNS, columns)},
+        }) + '\n'
+
+_ENCODERS = {
+    'csv': _csv,
+    'ndjson': _ndjson,
+    'columnar': _columnar,
+}
+
+def export_chunks(session, statement, fmt, chunk_size):
+    """Encoded text chunks of the export, one per partition of chunk_size rows"""
+    result = session.execute(statement.execution_options(yield_per=chunk_size))
+    try:
+        yield from _ENCODERS[fmt](result.partitions())
+    finally:
+        result.close()
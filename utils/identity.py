@@ -0,0 +1,110 @@
+"""
+Cached user identities for Flask-Login
+The user loader serves a lightweight snapshot from a bounded TTL cache and
+only loads the full ORM object when a route touches an attribute the
+snapshot does not carry.
+
+Snapshot keys carry a per-user version kept in the reference data backend
+(utils.refdata), so invalidate_identity() retires a snapshot the way
+refdata.invalidate() retires a directory. With REFDATA_CACHE_BACKEND=redis the
+version is shared and a blacklisted or deleted user is logged out on every
+worker at their next request; with the local backend other workers keep the
+old snapshot for at most USER_CACHE_TTL seconds.
+"""
+from flask_login import UserMixin
+from config import Config
+from extensions import db
+from models.user_identity import UserIdentity
+from utils import refdata
+from utils.cache import TTLCache
+
+USER_MODELS = UserIdentity.MODELS
+
+_cache = TTLCache(ttl=Config.USER_CACHE_TTL, maxsize=Config.USER_CACHE_SIZE)
+
+def _snapshot(user):
+    """Plain dict of the attributes routes and templates read on every request"""
+    snapshot = {
+        'id': user.id,
+        'role': user.role,
+        'email': user.email,
+    }
+    if user.role == 'admin':
+        snapshot['username'] = user.username
+        snapshot['active'] = bool(user.is_active)
+    else:
+        snapshot['name'] = user.name
+        snapshot['active'] = not user.is_blacklisted
+    if user.role == 'doctor':
+        snapshot['specialization'] = user.specialization
+    return snapshot
+
+class Identity(UserMixin):
+    """Logged-in user backed by a cached snapshot, ORM object attached on demand"""
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._user = None
+
+    def get_id(self):
+        """Return unique ID for Flask-Login"""
+        return f"{self._snapshot['role']}_{self._snapshot['id']}"
+
+    @property
+    def is_active(self):
+        return self._snapshot['active']
+
+    @property
+    def user(self):
+        """The full ORM object, loaded once per request on first use"""
+        if self._user is None:
+            model = USER_MODELS[self._snapshot['role']]
+            self._user = db.session.get(model, self._snapshot['id'])
+        return self._user
+
+    def __getattr__(self, name):
+        snapshot = self.__dict__.get('_snapshot')
+        if snapshot is not None and name in snapshot:
+            return snapshot[name]
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f'<Identity {self.get_id()}>'
+
+def _key(user_id):
+    """Snapshot key at the user's current version"""
+    return f'{user_id}:v{refdata.get_backend().version(f"identity:{user_id}")}'
+
+def load_identity(user_id):
+    """
+    Resolve a Flask-Login id (e.g. "doctor_5") to an Identity
+    Returns None for unknown, malformed or suspended accounts.
+    """
+    role, _, raw_id = user_id.partition('_')
+    model = USER_MODELS.get(role)
+    if model is None or not raw_id.isdigit():
+        return None
+
+    key = _key(user_id)
+    snapshot = _cache.get(key)
+    if snapshot is None:
+        user = db.session.get(model, int(raw_id))
+        if user is None:
+            return None
+        snapshot = _snapshot(user)
+        _cache.set(key, snapshot)
+
+    if not snapshot['active']:
+        return None
+    return Identity(snapshot)
+
+def invalidate_identity(user):
+    """
+    Retire the cached snapshot after the user's account was edited,
+    blacklisted or deleted
+    """
+    user_id = user.get_id()
+    _cache.delete(_key(user_id))
+    refdata.get_backend().bump(f'identity:{user_id}')
@@ -0,0 +1,132 @@
+"""
+Outbound mail queue
+Request handlers enqueue OutboxMessage rows in their own transaction; a
+background worker claims due messages and delivers them in batches over a
+single SMTP connection, retrying failures with exponential backoff.
+"""
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from flask_mail import Message
+from extensions import db, mail
+from models.outbox import OutboxMessage
+
+_worker = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+
+def enqueue_mail(subject, recipients, body):
+    """Add a message to the outbox, delivered after the caller commits"""
+    message = OutboxMessage(recipients=','.join(recipients), subject=subject, body=body)
+    db.session.add(message)
+    return message
+
+def notify_mail_worker():
+    """Wake the in-process worker after committing new messages"""
+    _wake.set()
+
+def _claim_batch(batch_size):
+    """
+    Claim up to batch_size due messages for this worker
+    The conditional UPDATE pushes next_attempt_at forward, so concurrent workers
+    never claim the same message; a crashed worker's claims expire and are retried.
+    """
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=current_app.config['MAIL_OUTBOX_CLAIM_TIMEOUT'])
+    table = OutboxMessage.__table__
+
+    due = db.session.execute(
+        db.select(table.c.id).where(
+            table.c.status.in_(['Pending', 'Sending']),
+            table.c.next_attempt_at <= now
+        ).order_by(table.c.next_attempt_at, table.c.id).limit(batch_size)
+    ).scalars().all()
+
+    claimed = []
+    for message_id in due:
+        result = db.session.execute(
+            table.update().where(
+                table.c.id == message_id,
+                table.c.status.in_(['Pending', 'Sending']),
+                table.c.next_attempt_at <= now
+            ).values(status='Sending', next_attempt_at=lease_until)
+        )
+        if result.rowcount:
+            claimed.append(message_id)
+    db.session.commit()
+    return claimed
+
+def _schedule_retry(message, error):
+    """Record a failed attempt and back off, giving up after MAIL_OUTBOX_MAX_ATTEMPTS"""
+    config = current_app.config
+    message.attempts = (message.attempts or 0) + 1
+    message.last_error = str(error)[:1000]
+    if message.attempts >= config['MAIL_OUTBOX_MAX_ATTEMPTS']:
+        message.status = 'Failed'
+        current_app.logger.error('Giving up on outbox message %s after %s attempts: %s',
+                                 message.id, message.attempts, error)
+        return
+    delay = min(config['MAIL_OUTBOX_RETRY_BASE'] * 2 ** (message.attempts - 1), config['MAIL_OUTBOX_RETRY_MAX'])
+    message.status = 'Pending'
+    message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+def send_pending(batch_size=None):
+    """Deliver one batch of due messages over one SMTP connection, returns the number claimed"""
+    batch_size = batch_size or current_app.config['MAIL_OUTBOX_BATCH_SIZE']
+    claimed = _claim_batch(batch_size)
+    if not claimed:
+        return 0
+
+    messages = OutboxMessage.query.filter(OutboxMessage.id.in_(claimed)).order_by(OutboxMessage.id).all()
+    try:
+        with mail.connect() as connection:
+            for message in messages:
+                try:
+                    connection.send(Message(message.subject, recipients=message.recipient_list, body=message.body))
+                except Exception as e:
+                    _schedule_retry(message, e)
+                else:
+                    message.status = 'Sent'
+                    message.sent_at = datetime.utcnow()
+                    message.body = None
+    except Exception as e:
+        # Could not connect, or the connection dropped - retry whatever was not sent
+        for message in messages:
+            if message.status == 'Sending':
+                _schedule_retry(message, e)
+
+    db.session.commit()
+    return len(claimed)
+
+def run_mail_worker(app, stop_event=None):
+    """Deliver messages until stop_event is set, sleeping MAIL_OUTBOX_POLL_INTERVAL when idle"""
+    while not (stop_event and stop_event.is_set()):
+        with app.app_context():
+            try:
+                claimed = send_pending()
+                full_batch = claimed >= app.config['MAIL_OUTBOX_BATCH_SIZE']
+            except Exception:
+                app.logger.exception('Mail worker iteration failed')
+                db.session.rollback()
+                full_batch = False
+        if not full_batch:
+            _wake.wait(app.config['MAIL_OUTBOX_POLL_INTERVAL'])
+            _wake.clear()
+
+def start_mail_worker(app):
+    """Start the background delivery thread once per process"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run_mail_worker, args=(app,), name='mail-worker', daemon=True)
+            _worker.start()
+    return _worker
+
+def init_mail_worker(app):
+    """
+    Start the in-process worker with the app when MAIL_WORKER_IN_PROCESS is set
+    Messages still queued, backing off or leased by a crashed worker when the
+    process restarted are delivered without waiting for a new message.
+    """
+    if app.config['MAIL_WORKER_IN_PROCESS']:
+        start_mail_worker(app)
@@ -0,0 +1,283 @@
+"""
+Prometheus-style metrics
+Counters and histograms are sharded per thread, so recording a value is a
+plain dict update on the calling thread's own shard with no lock taken;
+shards are merged when the registry is scraped. Under multi-process servers
+(gunicorn) each process periodically writes its totals to METRICS_DIR and
+the scrape sums every process's file. A worker's file is removed when it
+exits (gunicorn's child_exit hook calls mark_process_dead()), and a scrape
+skips and removes files of pids that no longer exist, so the directory only
+holds live workers; like a restart, this reads as a counter reset.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+class _Metric:
+    """Base for metrics with per-thread shards of {label values: value}"""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = {}  # thread -> shard, shards of finished threads are folded into _base
+        self._base = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards[threading.current_thread()] = shard
+        return shard
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @staticmethod
+    def _merge(into, value):
+        raise NotImplementedError
+
+    def samples(self):
+        """Merged {label values: value} over every thread"""
+        with self._lock:
+            for thread in [thread for thread in self._shards if not thread.is_alive()]:
+                for key, value in self._shards.pop(thread).items():
+                    self._base[key] = self._merge(self._base.get(key), value)
+            merged = {key: self._merge(None, value) for key, value in self._base.items()}
+            shards = list(self._shards.values())
+        for shard in shards:
+            for key, value in list(shard.items()):
+                merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    @staticmethod
+    def _merge(into, value):
+        return (into or 0) + value
+
+class Histogram(_Metric):
+    """Observations counted into buckets, with their sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        # [count per bucket..., count above the last bucket, sum]
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the block's duration in seconds"""
+        return _Timer(self, labels)
+
+    @staticmethod
+    def _merge(into, value):
+        if into is None:
+            return list(value)
+        return [a + b for a, b in zip(into, value)]
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+class Registry:
+    """All metrics of this process, rendered in the text exposition format"""
+
+    def __init__(self):
+        self.metrics = []
+        self.directory = None
+        self.flush_interval = 5
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def snapshot(self):
+        """{name: [[label values, value], ...]} for this process"""
+        return {metric.name: [[list(key), value] for key, value in metric.samples().items()]
+                for metric in self.metrics}
+
+    def flush(self):
+        """Write this process's totals to the shared directory"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path, os.path.join(self.directory, f'metrics-{os.getpid()}.json'))
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _collect(self):
+        """Samples per metric, summed over every process when a directory is set"""
+        if not self.directory:
+            return {metric.name: metric.samples() for metric in self.metrics}
+
+        self.flush()
+        by_name = {metric.name: metric for metric in self.metrics}
+        totals = {name: {} for name in by_name}
+        for filename in os.listdir(self.directory):
+            if not filename.startswith('metrics-'):
+                continue
+            pid = filename[len('metrics-'):-len('.json')]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                mark_process_dead(int(pid), self.directory)
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, samples in snapshot.items():
+                if name not in by_name:
+                    continue
+                for key, value in samples:
+                    key = tuple(key)
+                    totals[name][key] = by_name[name]._merge(totals[name].get(key), value)
+        return totals
+
+    def render(self):
+        """Text exposition format"""
+        collected = self._collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for key, value in sorted(collected[metric.name].items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind == 'counter':
+                    lines.append(f'{metric.name}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f'{metric.name}_bucket{_labels(labels + [("le", le)])} {cumulative}')
+                lines.append(f'{metric.name}_sum{_labels(labels)} {_number(value[-1])}')
+                lines.append(f'{metric.name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def mark_process_dead(pid, directory=None):
+    """Remove an exited worker's totals from METRICS_DIR"""
+    if directory is None:
+        from config import Config
+        directory = Config.METRICS_DIR
+    if not directory:
+        return
+    try:
+        os.remove(os.path.join(directory, f'metrics-{pid}.json'))
+    except FileNotFoundError:
+        pass
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by blueprint and endpoint',
+                            ['blueprint', 'endpoint'])
+REQUESTS = Counter('http_requests_total', 'Requests served by blueprint, endpoint and status',
+                   ['blueprint', 'endpoint', 'status'])
+BOOKING_CONFLICTS = Counter('booking_conflicts_total', 'Bookings rejected because the slot was taken', ['stage'])
+LOGIN_FAILURES = Counter('login_failures_total', 'Failed login attempts', ['reason'])
+PASSWORD_HASH_SECONDS = Histogram('password_hash_seconds', 'Time to hash or verify a password, queueing included',
+                                  ['operation'])
+DB_POOL_WAIT_SECONDS = Histogram('db_pool_wait_seconds', 'Time spent waiting for a pooled database connection',
+                                 ['bind'], buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+
+def _time_pool(engine, bind):
+    """Observe how long each connection checkout from the engine's pool takes"""
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start, bind=bind)
+
+    pool.connect = timed_connect
+
+def init_metrics(app):
+    """Time every request and pool checkout, flushing to METRICS_DIR when set"""
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    REGISTRY.directory = app.config['METRICS_DIR']
+    REGISTRY.flush_interval = app.config['METRICS_FLUSH_INTERVAL']
+
+    from extensions import db
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _time_pool(engine, bind or 'default')
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            blueprint = request.blueprint or 'app'
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_LATENCY.observe(time.perf_counter() - started, blueprint=blueprint, endpoint=endpoint)
+            REQUESTS.inc(blueprint=blueprint, endpoint=endpoint, status=response.status_code)
+            REGISTRY.maybe_flush()
+        return response
@@ -0,0 +1,137 @@
+"""
+Keyset (cursor-based) pagination and streamed list rendering
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from flask import current_app, request, render_template, stream_template, url_for, Response
+from sqlalchemy import and_, or_
+
+class KeysetPage:
+    """One page of keyset-paginated results"""
+
+    def __init__(self, items, next_cursor, cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        """True when another page follows this one"""
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        """True when this page was requested without a cursor"""
+        return self.cursor is None
+
+    def _url(self, cursor):
+        """Current endpoint URL with the query string kept and the cursor replaced"""
+        args = request.args.to_dict()
+        args.pop('cursor', None)
+        if cursor:
+            args['cursor'] = cursor
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @property
+    def next_url(self):
+        """URL of the following page, None on the last page"""
+        return self._url(self.next_cursor) if self.has_next else None
+
+    @property
+    def first_url(self):
+        """URL of the first page"""
+        return self._url(None)
+
+def _encode_value(value):
+    """Make a key value JSON serializable"""
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+def _decode_value(column, value):
+    """Convert a JSON cursor value back to the column's Python type"""
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is time:
+        return time.fromisoformat(value)
+    return python_type(value)
+
+def encode_cursor(values):
+    """Encode the key values of the last row into an opaque URL-safe cursor"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor produced by encode_cursor, returns None if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return [_decode_value(col, val) for col, val in zip(columns, values)]
+    except (ValueError, TypeError):
+        return None
+
+def _after(columns, values, descending):
+    """
+    Build the keyset predicate "row comes after (values)" in sort order
+    Expanded to (a > x) OR (a = x AND b > y) OR ... so every backend can use it
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        beyond = column < values[i] if descending else column > values[i]
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal_prefix, beyond))
+    return or_(*clauses)
+
+def get_per_page():
+    """Page size from ?per_page=, clamped to MAX_PER_PAGE"""
+    default = current_app.config.get('PER_PAGE', 50)
+    maximum = current_app.config.get('MAX_PER_PAGE', 200)
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, maximum))
+
+def keyset_paginate(query, columns, descending=True, cursor=None, per_page=None):
+    """
+    Paginate a query on a unique key (e.g. date, time, id)
+    The last column must be unique so that the ordering is total.
+    Reads ?cursor= and ?per_page= from the request when not given.
+    """
+    if cursor is None:
+        cursor = request.args.get('cursor') or None
+    if per_page is None:
+        per_page = get_per_page()
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if values is not None:
+            query = query.filter(_after(columns, values, descending))
+        else:
+            cursor = None
+
+    order = [col.desc() for col in columns] if descending else [col.asc() for col in columns]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, col.key) for col in columns])
+
+    return KeysetPage(rows, next_cursor, cursor)
+
+def render_list(template_name, **context):
+    """
+    Render a list page, streaming it in chunks when STREAM_LIST_PAGES is enabled
+    or the request asks for it with ?stream=1
+    """
+    stream = current_app.config.get('STREAM_LIST_PAGES') or request.args.get('stream') == '1'
+    if stream:
+        return Response(stream_template(template_name, **context))
+    return render_template(template_name, **context)
@@ -0,0 +1,88 @@
+"""
+Password hashing service
+Runs werkzeug's hash functions in a bounded process pool so slow hashes do
+not hold request threads, with the algorithm and cost set in Config. Each
+serving process starts its own pool (app.start_server_threads); a process
+without one, such as a CLI script, hashes inline.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+from utils.metrics import PASSWORD_HASH_SECONDS
+
+_executor = None
+_pid = None  # process that started _executor; a forked child must not use its parent's pool
+_slots = None
+_lock = threading.Lock()
+_method_prefixes = {}
+
+def _setting(name):
+    """Read a setting from the app config when available, else from Config"""
+    if has_app_context():
+        return current_app.config.get(name, getattr(Config, name))
+    return getattr(Config, name)
+
+def init_password_pool(app):
+    """Start this process's hashing pool, before it has any request or background threads"""
+    start_pool(app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_QUEUE_FACTOR'])
+
+def start_pool(workers, queue_factor):
+    """
+    Fork the worker processes now; with no pool (workers <= 0) hashes run inline
+    Forking a multithreaded process can leave the children holding copies of
+    locks other threads held (logging, the connection pool, the import lock),
+    so the workers are all forked here, from a single-threaded process, and
+    never from a request thread.
+    """
+    global _executor, _pid, _slots
+    with _lock:
+        if (_executor is not None and _pid == os.getpid()) or workers <= 0:
+            return
+        # fork keeps worker start-up cheap and does not re-run the parent's __main__ script;
+        # workers exit with os._exit, so inherited DB connections are never touched
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        _pid = os.getpid()
+        _slots = threading.BoundedSemaphore(workers * queue_factor)
+        # The pool forks every worker on its first task
+        _executor.submit(int).result()
+
+def _run(f, *args):
+    """Run f in the pool, blocking while the pool's queue is full"""
+    executor = _executor
+    if executor is None or _pid != os.getpid():
+        return f(*args)
+    with _slots:
+        return executor.submit(f, *args).result()
+
+def hash_password(password):
+    """Hash a password with the configured PASSWORD_HASH_METHOD"""
+    with PASSWORD_HASH_SECONDS.time(operation='hash'):
+        return _run(generate_password_hash, password, _setting('PASSWORD_HASH_METHOD'))
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash"""
+    with PASSWORD_HASH_SECONDS.time(operation='verify'):
+        return _run(check_password_hash, password_hash, password)
+
+def _method_prefix(method):
+    """Method string werkzeug stores for a configured method, e.g. "pbkdf2:sha256:600000" """
+    if method not in _method_prefixes:
+        _method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return _method_prefixes[method]
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with a different algorithm or cost than configured"""
+    return password_hash.split('$', 1)[0] != _method_prefix(_setting('PASSWORD_HASH_METHOD'))
+
+def shutdown():
+    """Stop the worker processes"""
+    global _executor
+    with _lock:
+        if _executor is not None and _pid == os.getpid():
+            _executor.shutdown()
+        _executor = None
@@ -0,0 +1,163 @@
+"""
+Opt-in per-request SQL profiling
+When SQL_PROFILING is on, engine events time every statement and Flask
+signals time template rendering; each request's numbers are folded into
+per-endpoint totals served by admin.profiling. Statement shapes repeated
+SQL_PROFILING_N_PLUS_ONE times within one request are flagged as likely N+1
+queries. When off, no listeners are attached at all.
+
+A request is recorded when its response is closed, so streamed pages
+(render_list, export downloads) include the queries run while the body was
+sent; their Server-Timing header can only cover the work done before it.
+Requests that match no route share one '<unmatched>' entry.
+"""
+import re
+import threading
+import time
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r'\s+')
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+def statement_shape(statement):
+    """Statement with literals and expanded IN lists collapsed, so repeats compare equal"""
+    shape = _LITERAL.sub('?', statement)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+class RequestProfile:
+    """Statements and template time collected during one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = []  # (milliseconds, statement)
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self._template_started = None
+
+    def repeated_shapes(self, threshold):
+        """{shape: count} for statement shapes executed at least threshold times"""
+        counts = {}
+        for _, statement in self.statements:
+            shape = statement_shape(statement)
+            counts[shape] = counts.get(shape, 0) + 1
+        return {shape: count for shape, count in counts.items() if count >= threshold}
+
+def _current_profile():
+    return g.get('_sql_profile') if has_request_context() else None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile() is not None:
+        conn.info.setdefault('_profile_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile()
+    started = conn.info.get('_profile_started')
+    if profile is None or not started:
+        return
+    elapsed = (time.perf_counter() - started.pop()) * 1000
+    profile.statements.append((elapsed, statement))
+    profile.db_ms += elapsed
+
+def _before_render(sender, template, context, **extra):
+    profile = _current_profile()
+    if profile is not None:
+        profile._template_started = time.perf_counter()
+
+def _rendered(sender, template, context, **extra):
+    profile = _current_profile()
+    if profile is not None and profile._template_started is not None:
+        profile.template_ms += (time.perf_counter() - profile._template_started) * 1000
+        profile._template_started = None
+
+def _record(app, endpoint, profile, total_ms):
+    """Fold one request into the endpoint's totals"""
+    config = app.config
+    repeated = profile.repeated_shapes(config['SQL_PROFILING_N_PLUS_ONE'])
+    for shape, count in repeated.items():
+        app.logger.warning('Possible N+1 in %s: %d x %s', endpoint, count, shape)
+
+    keep = config['SQL_PROFILING_SLOWEST']
+    with _stats_lock:
+        stats = _stats.setdefault(endpoint, {
+            'requests': 0, 'queries': 0, 'max_queries': 0,
+            'db_ms': 0.0, 'template_ms': 0.0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'slowest': [], 'n_plus_one': {},
+        })
+        stats['requests'] += 1
+        stats['queries'] += len(profile.statements)
+        stats['max_queries'] = max(stats['max_queries'], len(profile.statements))
+        stats['db_ms'] += profile.db_ms
+        stats['template_ms'] += profile.template_ms
+        stats['total_ms'] += total_ms
+        stats['max_ms'] = max(stats['max_ms'], total_ms)
+        slowest = stats['slowest'] + [(round(ms, 3), statement) for ms, statement in profile.statements]
+        stats['slowest'] = sorted(slowest, key=lambda item: item[0], reverse=True)[:keep]
+        for shape, count in repeated.items():
+            stats['n_plus_one'][shape] = max(stats['n_plus_one'].get(shape, 0), count)
+
+def _server_timing(profile, total_ms):
+    return (f'db;dur={profile.db_ms:.2f};desc="{len(profile.statements)} queries", '
+            f'tpl;dur={profile.template_ms:.2f}, total;dur={total_ms:.2f}')
+
+def init_profiling(app):
+    """Attach the profiling hooks when SQL_PROFILING is enabled"""
+    if not app.config['SQL_PROFILING']:
+        return
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.before_request
+    def _start_profile():
+        g._sql_profile = RequestProfile()
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = g.get('_sql_profile')
+        if profile is None:
+            return response
+        if app.config['SQL_PROFILING_SERVER_TIMING']:
+            response.headers['Server-Timing'] = _server_timing(profile, (time.perf_counter() - profile.started) * 1000)
+        # Scanners and bots hitting unknown URLs must not grow the totals without bound
+        endpoint = request.endpoint or '<unmatched>'
+
+        def record():
+            _record(app, endpoint, profile, (time.perf_counter() - profile.started) * 1000)
+        response.call_on_close(record)
+        return response
+
+def profiling_summary():
+    """Per-endpoint totals and averages, heaviest total DB time first"""
+    with _stats_lock:
+        endpoints = []
+        for endpoint, stats in _stats.items():
+            requests = stats['requests']
+            endpoints.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'avg_queries': round(stats['queries'] / requests, 2),
+                'max_queries': stats['max_queries'],
+                'avg_db_ms': round(stats['db_ms'] / requests, 3),
+                'avg_template_ms': round(stats['template_ms'] / requests, 3),
+                'avg_total_ms': round(stats['total_ms'] / requests, 3),
+                'max_total_ms': round(stats['max_ms'], 3),
+                'total_db_ms': round(stats['db_ms'], 3),
+                'slowest_statements': [{'ms': ms, 'statement': statement} for ms, statement in stats['slowest']],
+                'n_plus_one': [{'count': count, 'statement': shape}
+                               for shape, count in sorted(stats['n_plus_one'].items(), key=lambda item: -item[1])],
+            })
+    return sorted(endpoints, key=lambda item: item['total_db_ms'], reverse=True)
+
+def reset_profiling():
+    """Forget the collected totals"""
+    with _stats_lock:
+        _stats.clear()
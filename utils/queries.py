@@ -0,0 +1,98 @@
+"""
+Shared query builders - eager-loaded appointment and treatment queries
+Used by the admin, doctor and patient blueprints to avoid N+1 lookups
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.treatment import Treatment
+
+def appointment_query():
+    """
+    Appointment query with patient, doctor, department and treatment loaded
+    All related rows come back in the same SELECT via LEFT OUTER JOINs
+    """
+    return Appointment.query.options(
+        joinedload(Appointment.patient),
+        joinedload(Appointment.doctor).joinedload(Doctor.department_rel),
+        joinedload(Appointment.treatment)
+    )
+
+def treatment_query():
+    """Treatment query with its appointment, patient, doctor and department loaded"""
+    return Treatment.query.options(
+        joinedload(Treatment.appointment).joinedload(Appointment.patient),
+        joinedload(Treatment.appointment).joinedload(Appointment.doctor).joinedload(Doctor.department_rel)
+    )
+
+def _time_arg(name):
+    """Parse an HH:MM query string argument, None if absent or invalid"""
+    value = request.args.get(name)
+    try:
+        return datetime.strptime(value, '%H:%M').time() if value else None
+    except ValueError:
+        return None
+
+def filter_time_window(query):
+    """
+    Restrict an appointment query to ?from=HH:MM <= time < ?to=HH:MM
+    Either bound may be omitted; the comparison runs in SQL on the TIME column.
+    """
+    time_from = _time_arg('from')
+    time_to = _time_arg('to')
+    if time_from:
+        query = query.filter(Appointment.time >= time_from)
+    if time_to:
+        query = query.filter(Appointment.time < time_to)
+    return query
+
+class QueryCounter:
+    """Collects SQL statements executed on the engine while attached"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        """Number of statements executed"""
+        return len(self.statements)
+
+@contextmanager
+def count_queries():
+    """
+    Count SQL statements executed inside the block
+    Usage:
+        with count_queries() as counter:
+            client.get('/admin/appointments')
+        print(counter.count)
+    """
+    counter = QueryCounter()
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail with AssertionError if the block executes more than `limit` statements
+    Usage:
+        with assert_max_queries(3):
+            client.get('/admin/appointments')
+    """
+    with count_queries() as counter:
+        yield counter
+
+    if counter.count > limit:
+        statements = '\n'.join(counter.statements)
+        raise AssertionError(f'Expected at most {limit} queries, got {counter.count}:\n{statements}')
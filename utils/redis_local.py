@@ -0,0 +1,155 @@
+"""
+Local Redis stand-in
+Speaks enough of the Redis protocol (RESP) for the shared reference data
+cache: PING, GET, SET with EX/PX, INCR/INCRBY, DEL, EXISTS, FLUSHDB and the CLIENT
+and SELECT calls redis-py makes on connect. Keys live in memory and expire
+like Redis keys, for exercising REFDATA_CACHE_BACKEND=redis without a Redis
+server.
+
+Usage:
+    python -m utils.redis_local --port 6379
+    REFDATA_CACHE_BACKEND=redis REFDATA_CACHE_URL=redis://localhost:6379/0 python app.py
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+class _RESPHandler(socketserver.StreamRequestHandler):
+    """One client connection: read command arrays, answer in RESP2"""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            # Inline command, e.g. typed into telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def reply(self, value):
+        if value is None:
+            data = b'$-1\r\n'
+        elif isinstance(value, int):
+            data = b':%d\r\n' % value
+        elif isinstance(value, bytes):
+            data = b'$%d\r\n%s\r\n' % (len(value), value)
+        elif isinstance(value, Exception):
+            data = f'-ERR {value}\r\n'.encode()
+        else:
+            data = f'+{value}\r\n'.encode()
+        self.wfile.write(data)
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            try:
+                self.reply(store.execute(args[0].decode().upper(), args[1:]))
+            except (ValueError, IndexError) as e:
+                self.reply(e)
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class LocalRedis:
+    """
+    In-memory Redis-compatible server running in a background thread
+    Usage:
+        with LocalRedis() as server:
+            app.config['REFDATA_CACHE_URL'] = server.url
+            ...
+    """
+
+    def __init__(self, host='localhost', port=0):
+        self._data = {}  # key -> (value, expires at monotonic time or None)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _RESPHandler)
+        self._server.store = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        return f'redis://{self._server.server_address[0]}:{self.port}/0'
+
+    def _get(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def execute(self, command, args):
+        with self._lock:
+            if command == 'PING':
+                return args[0] if args else 'PONG'
+            if command in ('CLIENT', 'SELECT'):
+                return 'OK'
+            if command == 'GET':
+                entry = self._get(args[0])
+                return entry[0] if entry else None
+            if command == 'SET':
+                expires = None
+                options = [arg.decode().upper() for arg in args[2:]]
+                for option, value in zip(options, args[3:]):
+                    if option == 'EX':
+                        expires = time.monotonic() + int(value)
+                    elif option == 'PX':
+                        expires = time.monotonic() + int(value) / 1000
+                self._data[args[0]] = (args[1], expires)
+                return 'OK'
+            if command in ('INCR', 'INCRBY'):
+                entry = self._get(args[0])
+                step = int(args[1]) if command == 'INCRBY' else 1
+                value = int(entry[0]) + step if entry else step
+                self._data[args[0]] = (str(value).encode(), entry[1] if entry else None)
+                return value
+            if command == 'DEL':
+                return sum(self._data.pop(key, None) is not None for key in args)
+            if command == 'EXISTS':
+                return sum(self._get(key) is not None for key in args)
+            if command in ('FLUSHDB', 'FLUSHALL'):
+                self._data.clear()
+                return 'OK'
+            raise ValueError(f"unknown command '{command}'")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Redis stand-in for the shared reference data cache')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+
+    server = LocalRedis(args.host, args.port)
+    print(f'Redis stand-in listening on {server.url}')
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
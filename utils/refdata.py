@@ -0,0 +1,169 @@
+"""
+Reference data cache
+Departments and the public (non-blacklisted) doctor directory change a few
+times a day but are read on most patient pages, so they are served from a
+cache as plain dicts. Keys carry a version number: invalidate() bumps the
+version, so every reader switches to a fresh key at once and old entries
+simply age out.
+
+REFDATA_CACHE_BACKEND picks the backend:
+    local   per-process LRU (utils.cache.TTLCache), the default. Invalidation
+            reaches the current worker only, other workers can serve the old
+            list for at most REFDATA_CACHE_TTL seconds.
+    redis   any Redis-compatible server at REFDATA_CACHE_URL (Redis, Valkey,
+            KeyDB, a local redis-server). Versions are shared, so invalidation
+            reaches every worker immediately; REFDATA_CACHE_TTL still caps
+            entry age. Needs the redis package from
+            requirements-optional.txt. For development without a server,
+            utils/redis_local.py is an in-memory stand-in
+            (python -m utils.redis_local); benchmarks/refdata_shared.py checks
+            cross-worker invalidation against it.
+
+Misses are loaded from the primary database, so a lagging read replica can
+never be cached as the fresh version. Booking always re-checks a doctor's
+blacklist status against the database.
+"""
+import hashlib
+import json
+import threading
+from sqlalchemy import select
+from config import Config
+from extensions import db
+from models.department import Department
+from models.doctor import Doctor
+from utils.cache import TTLCache
+
+_MISSING = object()
+
+class LocalBackend:
+    """In-process LRU with per-process version counters"""
+
+    def __init__(self, ttl, maxsize):
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, name):
+        return self._versions.get(name, 0)
+
+    def bump(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+        self._cache.clear(lambda key: key.startswith(f'{name}:'))
+
+    def get(self, key):
+        return self._cache.get(key, _MISSING)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+class RedisBackend:
+    """Shared cache on a Redis-compatible server, values stored as JSON"""
+
+    def __init__(self, url, ttl, prefix='refdata:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("REFDATA_CACHE_BACKEND=redis needs the redis package (pip install -r requirements-optional.txt)")
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def version(self, name):
+        return int(self._client.get(f'{self.prefix}version:{name}') or 0)
+
+    def bump(self, name):
+        self._client.incr(f'{self.prefix}version:{name}')
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return _MISSING if value is None else json.loads(value)
+
+    def set(self, key, value):
+        self._client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+def _create_backend():
+    kind = Config.REFDATA_CACHE_BACKEND
+    if kind == 'local':
+        return LocalBackend(Config.REFDATA_CACHE_TTL, Config.REFDATA_CACHE_SIZE)
+    if kind == 'redis':
+        return RedisBackend(Config.REFDATA_CACHE_URL, Config.REFDATA_CACHE_TTL)
+    raise ValueError(f"Unknown REFDATA_CACHE_BACKEND {kind!r}, expected 'local' or 'redis'")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+    return _backend
+
+def _primary_rows(statement):
+    """Run a read on the primary database, even inside a @use_replica view"""
+    return db.session.execute(statement, bind_arguments={'bind': db.engine}).all()
+
+def _load_departments():
+    rows = _primary_rows(
+        select(Department.id, Department.department_name, Department.description).order_by(Department.id)
+    )
+    return [dict(row._mapping) for row in rows]
+
+def _load_doctors():
+    rows = _primary_rows(
+        select(Doctor.id, Doctor.name, Doctor.email, Doctor.contact, Doctor.specialization_id,
+               Department.department_name.label('specialization'))
+        .outerjoin(Department, Department.id == Doctor.specialization_id)
+        .where(Doctor.is_blacklisted == False)
+        .order_by(Doctor.id)
+    )
+    return [dict(row._mapping) for row in rows]
+
+_LOADERS = {
+    'departments': _load_departments,
+    'doctors': _load_doctors,
+}
+
+def _cached(name):
+    backend = get_backend()
+    key = f'{name}:v{backend.version(name)}'
+    value = backend.get(key)
+    if value is _MISSING:
+        value = _LOADERS[name]()
+        backend.set(key, value)
+    return value
+
+def get_departments():
+    """All departments as dicts with id, department_name and description"""
+    return _cached('departments')
+
+def get_doctor_directory(specialization_id=None):
+    """
+    Non-blacklisted doctors as dicts with id, name, email, contact,
+    specialization_id and specialization (the department name)
+    """
+    doctors = _cached('doctors')
+    if specialization_id is not None:
+        doctors = [doctor for doctor in doctors if doctor['specialization_id'] == specialization_id]
+    return doctors
+
+def fingerprint(*names):
+    """
+    Hash of the named reference data as this worker serves it right now
+    Pages rendered from the cache validate against this rather than the
+    database, so a worker still holding an old version never sends it under a
+    new ETag.
+    """
+    content = {name: _cached(name) for name in names}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+def invalidate(*names):
+    """
+    Start a new version of the named reference data, or of all of it
+    Call after committing a change to departments or doctors.
+    """
+    for name in names or _LOADERS:
+        get_backend().bump(name)
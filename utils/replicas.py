@@ -0,0 +1,71 @@
+"""
+Read-replica routing
+Views decorated with @use_replica run their reads on one of the replica binds
+from DATABASE_REPLICA_URIS. Flushes and Core INSERT/UPDATE/DELETE always go
+to the primary, and once a request writes, the rest of that request and the
+user's requests for REPLICA_STICKY_SECONDS afterwards read from the primary
+too, so nobody misses their own write because of replication lag.
+"""
+import random
+import time
+from functools import wraps
+from flask import current_app, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+# Bind key prefix of the replicas in SQLALCHEMY_BINDS, see Config
+REPLICA_PREFIX = 'replica_'
+
+# Flask session key holding the time until which this user reads from the primary
+_STICKY_KEY = '_db_primary_until'
+
+class RoutingSession(Session):
+    """db.session that sends reads to a replica when the view allows it"""
+
+    def _replica(self):
+        """The replica engine for this session, chosen once so a request sees one snapshot"""
+        if 'replica' not in self.info:
+            replicas = [engine for key, engine in self._db.engines.items()
+                        if key is not None and key.startswith(REPLICA_PREFIX)]
+            self.info['replica'] = random.choice(replicas) if replicas else None
+        return self.info['replica']
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+        if bind is None and self.info.get('use_replica') and not self.info.get('wrote'):
+            replica = self._replica()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _flushing(session, flush_context, instances):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if session.info.get('wrote') and has_request_context():
+        flask_session[_STICKY_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+
+def _sticky():
+    return flask_session.get(_STICKY_KEY, 0) > time.time()
+
+def use_replica(f):
+    """
+    Let a read-only view read from a replica
+    Place it below the auth decorators, so the user loader still reads the primary.
+    Usage:
+        @bp.route('/doctors')
+        @login_required
+        @patient_required
+        @use_replica
+        def find_doctors(): ...
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not _sticky():
+            current_app.extensions['sqlalchemy'].session.info['use_replica'] = True
+        return f(*args, **kwargs)
+    return decorated_function
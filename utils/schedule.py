@@ -0,0 +1,268 @@
+"""
+Materialised per-doctor daily schedule
+doctor_schedule_days keeps one row per doctor and day for the SCHEDULE_DAYS
+days starting today: slot capacity from the weekly availability, Booked,
+Completed and Cancelled counts, the free and booked slot times and the first
+free slot. Dashboards, booking checks and slot lookups read these rows by
+primary key instead of expanding availability and scanning appointments.
+
+Appointment and availability writes mark the days they touch in the session.
+Just before commit those days are recomputed from source in the same
+transaction, so the rows never disagree with the appointments. The doctor rows
+are locked first, so concurrent transactions touching the same doctor take
+turns and each recomputes after the previous one committed. Core bulk
+writes call mark_days() or mark_doctor() themselves. Days outside the window,
+or not built yet, are computed live. rebuild_schedule.py rebuilds the window
+and drops past days; run it daily so the window rolls forward.
+"""
+from datetime import date, datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import delete, event, insert, select, tuple_
+from sqlalchemy.orm import Session, object_session
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.doctor_availability import DoctorAvailability
+from models.doctor_schedule import DoctorScheduleDay
+from utils.slots import generate_slots, slot_minutes
+
+_table = DoctorScheduleDay.__table__
+
+def window():
+    """First and last date of the materialised window"""
+    today = date.today()
+    return today, today + timedelta(days=current_app.config['SCHEDULE_DAYS'] - 1)
+
+def format_slots(times):
+    return ','.join(slot.strftime('%H:%M') for slot in times)
+
+def parse_slots(text):
+    """Slot times from a free_slots/booked_slots column"""
+    return [time.fromisoformat(value) for value in text.split(',')] if text else []
+
+def _overlapped(day, slots, held, minutes):
+    """
+    The grid slots that a held appointment overlaps
+    Appointments need not sit on the grid (imports accept any HH:MM), so one at
+    09:30 with 60-minute slots takes both the 09:00 and the 10:00 slot.
+    """
+    if not held:
+        return set()
+    length = timedelta(minutes=minutes)
+    starts = [datetime.combine(day, slot) for slot in held]
+    taken = set()
+    for slot in slots:
+        slot_start = datetime.combine(day, slot)
+        if any(slot_start < held_start + length and held_start < slot_start + length for held_start in starts):
+            taken.add(slot)
+    return taken
+
+def compute_days(executor, doctor_ids, start, end):
+    """
+    Schedule rows for every doctor and day from start to end, computed from source
+    Two queries regardless of the number of doctors or days; executor is a
+    Session or Connection.
+    """
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids or end < start:
+        return []
+    minutes = slot_minutes()
+
+    weekly = {}
+    for availability in executor.execute(
+        select(DoctorAvailability.doctor_id, DoctorAvailability.day_of_week,
+               DoctorAvailability.start_time, DoctorAvailability.end_time)
+        .where(DoctorAvailability.doctor_id.in_(doctor_ids))
+    ):
+        weekly[(availability.doctor_id, availability.day_of_week)] = generate_slots(availability, minutes)
+
+    counts, held = {}, {}
+    for doctor_id, day, slot, status in executor.execute(
+        select(Appointment.doctor_id, Appointment.date, Appointment.time, Appointment.status).where(
+            Appointment.doctor_id.in_(doctor_ids), Appointment.date >= start, Appointment.date <= end
+        )
+    ):
+        day_counts = counts.setdefault((doctor_id, day), {})
+        day_counts[status] = day_counts.get(status, 0) + 1
+        if status != 'Cancelled':
+            held.setdefault((doctor_id, day), set()).add(slot)
+
+    rows = []
+    day = start
+    while day <= end:
+        day_name = day.strftime('%A')
+        for doctor_id in doctor_ids:
+            slots = weekly.get((doctor_id, day_name), [])
+            taken = _overlapped(day, slots, held.get((doctor_id, day), ()), minutes)
+            free = [slot for slot in slots if slot not in taken]
+            day_counts = counts.get((doctor_id, day), {})
+            rows.append({
+                'doctor_id': doctor_id,
+                'date': day,
+                'capacity': len(slots),
+                'booked': day_counts.get('Booked', 0),
+                'completed': day_counts.get('Completed', 0),
+                'cancelled': day_counts.get('Cancelled', 0),
+                'free': len(free),
+                'next_free': free[0] if free else None,
+                'free_slots': format_slots(free),
+                'booked_slots': format_slots(slot for slot in slots if slot in taken),
+            })
+        day += timedelta(days=1)
+    return rows
+
+def _store(conn, rows):
+    """Replace the stored rows for the rows' (doctor_id, date) keys"""
+    if not rows:
+        return
+    conn.execute(delete(_table).where(
+        tuple_(_table.c.doctor_id, _table.c.date).in_([(row['doctor_id'], row['date']) for row in rows])
+    ))
+    conn.execute(insert(_table), rows)
+
+def _lock_doctors(query):
+    """
+    Lock the selected doctor rows until commit (a no-op on SQLite, which
+    serialises writers anyway). Rows are locked in id order so transactions
+    never wait on each other in a cycle; key_share (FOR NO KEY UPDATE on
+    Postgres) still lets appointment inserts check their doctor foreign key.
+    A missing schedule row cannot be locked, so the doctor row guards both the
+    DELETE and the INSERT in _store.
+    """
+    return query.order_by(Doctor.id).with_for_update(key_share=True)
+
+def refresh(conn, keys):
+    """
+    Recompute stored days inside the window
+    keys are (doctor_id, date) pairs, (doctor_id, None) for the doctor's whole window.
+    The days are computed only after their doctors are locked, so they include
+    every appointment committed by transactions that held the lock before.
+    """
+    start, end = window()
+    whole, days = set(), {}
+    for doctor_id, day in keys:
+        if day is None:
+            whole.add(doctor_id)
+        elif start <= day <= end:
+            days.setdefault(doctor_id, set()).add(day)
+    for doctor_id in whole:
+        days.pop(doctor_id, None)
+    if not whole and not days:
+        return
+
+    existing = set(conn.execute(_lock_doctors(select(Doctor.id).where(Doctor.id.in_(whole | set(days)))))
+                   .scalars())
+    if whole:
+        _store(conn, compute_days(conn, whole & existing, start, end))
+    if days:
+        wanted = {(doctor_id, day) for doctor_id, doctor_days in days.items() for day in doctor_days}
+        first, last = min(day for _, day in wanted), max(day for _, day in wanted)
+        _store(conn, [row for row in compute_days(conn, set(days) & existing, first, last)
+                      if (row['doctor_id'], row['date']) in wanted])
+
+def rebuild(batch_size=200, log=None):
+    """Recompute the whole window for every doctor and drop days outside it; the caller commits"""
+    start, end = window()
+    # Hold off incremental refreshes until the rebuilt rows are committed
+    doctor_ids = db.session.execute(_lock_doctors(select(Doctor.id))).scalars().all()
+    db.session.execute(delete(_table))
+    for offset in range(0, len(doctor_ids), batch_size):
+        batch = doctor_ids[offset:offset + batch_size]
+        rows = compute_days(db.session, batch, start, end)
+        if rows:
+            db.session.execute(insert(_table), rows)
+        if log:
+            log(f'  {offset + len(batch)}/{len(doctor_ids)} doctors')
+    return len(doctor_ids) * ((end - start).days + 1)
+
+# Reads
+
+def schedule_days(doctor_ids, start, end):
+    """
+    {doctor_id: {date: row dict}} for every doctor and day from start to end
+    Stored rows are read by primary key; days missing from doctor_schedule_days
+    (beyond the window or not built yet) are computed live.
+    """
+    doctor_ids = list(doctor_ids)
+    result = {doctor_id: {} for doctor_id in doctor_ids}
+    if not doctor_ids or end < start:
+        return result
+    for row in db.session.execute(
+        select(_table).where(_table.c.doctor_id.in_(doctor_ids), _table.c.date >= start, _table.c.date <= end)
+    ).mappings():
+        result[row['doctor_id']][row['date']] = dict(row)
+
+    expected = (end - start).days + 1
+    missing = [doctor_id for doctor_id, days in result.items() if len(days) < expected]
+    for row in compute_days(db.session, missing, start, end):
+        result[row['doctor_id']].setdefault(row['date'], row)
+    return result
+
+def get_day(doctor_id, day):
+    """One doctor's schedule row for one day"""
+    return schedule_days([doctor_id], day, day)[doctor_id][day]
+
+def first_free_slot(rows):
+    """(date, time) of the first free slot still ahead in these schedule rows, None if there is none"""
+    now = datetime.now()
+    for row in sorted(rows, key=lambda row: row['date']):
+        for slot in parse_slots(row['free_slots']):
+            if datetime.combine(row['date'], slot) > now:
+                return row['date'], slot
+    return None
+
+def next_free_slot(doctor_id):
+    """(date, time) of the doctor's next free slot inside the window, None if fully booked"""
+    start, end = window()
+    return first_free_slot(db.session.execute(
+        select(_table.c.date, _table.c.free_slots).where(
+            _table.c.doctor_id == doctor_id, _table.c.date >= start, _table.c.date <= end, _table.c.free > 0
+        )
+    ).mappings())
+
+# Incremental maintenance: mark touched days during flush, recompute them before commit
+
+def mark_days(session, keys):
+    """Recompute these (doctor_id, date) days when the session commits"""
+    session.info.setdefault('schedule_dirty', set()).update(keys)
+
+def mark_doctor(session, doctor_id):
+    """Recompute the doctor's whole window when the session commits"""
+    mark_days(session, [(doctor_id, None)])
+
+def _appointment_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    keys = {(target.doctor_id, target.date)}
+    state = db.inspect(target)
+    doctor_history, date_history = state.attrs.doctor_id.history, state.attrs.date.history
+    if doctor_history.deleted or date_history.deleted:
+        keys.add((doctor_history.deleted[0] if doctor_history.deleted else target.doctor_id,
+                  date_history.deleted[0] if date_history.deleted else target.date))
+    mark_days(session, keys)
+
+def _availability_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        mark_doctor(session, target.doctor_id)
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Appointment, _event, _appointment_changed)
+    event.listen(DoctorAvailability, _event, _availability_changed)
+
+@event.listens_for(Doctor, 'before_delete')
+def _doctor_deleted(mapper, connection, target):
+    connection.execute(delete(_table).where(_table.c.doctor_id == target.id))
+
+@event.listens_for(Session, 'before_commit')
+def _refresh_marked(session):
+    # Commit flushes after before_commit, so flush here to collect this transaction's marks
+    session.flush()
+    keys = session.info.pop('schedule_dirty', None)
+    if keys:
+        refresh(session.connection(bind_arguments={'bind': db.engine}), keys)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_marked(session):
+    session.info.pop('schedule_dirty', None)
@@ -0,0 +1,172 @@
+"""
+Full-text search for admin patient/doctor search
+SQLite: FTS5 tables with the trigram tokenizer, so substring matches like the
+old ILIKE '%query%' are served from an index and ranked with bm25().
+PostgreSQL: pg_trgm GIN indexes make the same ILIKE predicates indexable.
+Other backends fall back to plain ILIKE.
+The SQLite index is kept current by ORM events in the writing transaction.
+"""
+from sqlalchemy import bindparam, event, func, or_, text
+from sqlalchemy.orm import contains_eager
+from extensions import db
+from models.department import Department
+from models.doctor import Doctor
+from models.patient import Patient
+
+# Queries shorter than a trigram cannot use the FTS index
+MIN_FTS_QUERY_LENGTH = 3
+
+_SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patient_search USING fts5(name, email, contact, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS doctor_search USING fts5(name, email, department, tokenize='trigram')",
+]
+_SQLITE_DROP = [
+    "DROP TABLE IF EXISTS patient_search",
+    "DROP TABLE IF EXISTS doctor_search",
+]
+_POSTGRESQL_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_patients_name_trgm ON patients USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_patients_email_trgm ON patients USING gin (email gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_patients_contact_trgm ON patients USING gin (contact gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_doctors_name_trgm ON doctors USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_doctors_email_trgm ON doctors USING gin (email gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_departments_name_trgm ON departments USING gin (department_name gin_trgm_ops)",
+]
+
+class SearchPage:
+    """One page of ranked search results"""
+
+    def __init__(self, items, page, per_page, has_next):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+def create_search_index(conn):
+    """Create the backend's search structures if missing"""
+    statements = {'sqlite': _SQLITE_CREATE, 'postgresql': _POSTGRESQL_CREATE}.get(conn.dialect.name, [])
+    for statement in statements:
+        conn.execute(text(statement))
+
+_PATIENT_ROWS = "SELECT id, name, email, COALESCE(contact, '') FROM patients"
+_DOCTOR_ROWS = (
+    "SELECT doctors.id, doctors.name, doctors.email, COALESCE(departments.department_name, '') "
+    "FROM doctors LEFT JOIN departments ON departments.id = doctors.specialization_id"
+)
+
+def rebuild_search_index(conn):
+    """Repopulate the SQLite FTS tables from patients and doctors"""
+    if conn.dialect.name != 'sqlite':
+        return
+    conn.execute(text("DELETE FROM patient_search"))
+    conn.execute(text(f"INSERT INTO patient_search (rowid, name, email, contact) {_PATIENT_ROWS}"))
+    conn.execute(text("DELETE FROM doctor_search"))
+    conn.execute(text(f"INSERT INTO doctor_search (rowid, name, email, department) {_DOCTOR_ROWS}"))
+
+def index_new_rows(conn, kind, ids):
+    """Add freshly bulk-inserted patients or doctors (kind) to the SQLite FTS tables"""
+    if conn.dialect.name != 'sqlite' or not ids:
+        return
+    table, columns, rows, id_column = {
+        'patient': ('patient_search', 'name, email, contact', _PATIENT_ROWS, 'id'),
+        'doctor': ('doctor_search', 'name, email, department', _DOCTOR_ROWS, 'doctors.id'),
+    }[kind]
+    conn.execute(
+        text(f"INSERT INTO {table} (rowid, {columns}) {rows} WHERE {id_column} IN :ids")
+        .bindparams(bindparam('ids', expanding=True)),
+        {'ids': list(ids)}
+    )
+
+@event.listens_for(db.metadata, 'after_create')
+def _after_create(target, connection, **kw):
+    create_search_index(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _before_drop(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in _SQLITE_DROP:
+            connection.execute(text(statement))
+
+# Incremental maintenance of the SQLite index
+
+def _index_patient(connection, patient):
+    connection.execute(text("DELETE FROM patient_search WHERE rowid = :id"), {'id': patient.id})
+    connection.execute(
+        text("INSERT INTO patient_search (rowid, name, email, contact) VALUES (:id, :name, :email, :contact)"),
+        {'id': patient.id, 'name': patient.name, 'email': patient.email, 'contact': patient.contact or ''}
+    )
+
+def _index_doctor(connection, doctor):
+    department = connection.execute(
+        text("SELECT department_name FROM departments WHERE id = :id"), {'id': doctor.specialization_id}
+    ).scalar()
+    connection.execute(text("DELETE FROM doctor_search WHERE rowid = :id"), {'id': doctor.id})
+    connection.execute(
+        text("INSERT INTO doctor_search (rowid, name, email, department) VALUES (:id, :name, :email, :department)"),
+        {'id': doctor.id, 'name': doctor.name, 'email': doctor.email, 'department': department or ''}
+    )
+
+def _listen(model, index, table):
+    def upsert(mapper, connection, target):
+        if connection.dialect.name == 'sqlite':
+            index(connection, target)
+
+    def delete(mapper, connection, target):
+        if connection.dialect.name == 'sqlite':
+            connection.execute(text(f"DELETE FROM {table} WHERE rowid = :id"), {'id': target.id})
+
+    event.listen(model, 'after_insert', upsert)
+    event.listen(model, 'after_update', upsert)
+    event.listen(model, 'after_delete', delete)
+
+_listen(Patient, _index_patient, 'patient_search')
+_listen(Doctor, _index_doctor, 'doctor_search')
+
+# Queries
+
+def _fts_phrase(query):
+    """Quote user input as an FTS5 phrase so operators in it are matched literally"""
+    return '"' + query.replace('"', '""') + '"'
+
+def _ranked_ids(table, weights, query, offset, limit):
+    """Row ids from an FTS table ordered by bm25 rank"""
+    return db.session.execute(
+        text(f"SELECT rowid FROM {table} WHERE {table} MATCH :query "
+             f"ORDER BY bm25({table}, {weights}) LIMIT :limit OFFSET :offset"),
+        {'query': _fts_phrase(query), 'limit': limit, 'offset': offset}
+    ).scalars().all()
+
+def _page(model, query, columns, fts_table, weights, page, per_page, base_query):
+    """Shared search flow: FTS on SQLite, trigram-indexed ILIKE elsewhere"""
+    page = max(page, 1)
+    offset = (page - 1) * per_page
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'sqlite' and len(query) >= MIN_FTS_QUERY_LENGTH:
+        ids = _ranked_ids(fts_table, weights, query, offset, per_page + 1)
+        by_id = {item.id: item for item in base_query.filter(model.id.in_(ids[:per_page]))}
+        items = [by_id[i] for i in ids[:per_page] if i in by_id]
+        return SearchPage(items, page, per_page, len(ids) > per_page)
+
+    pattern = f'%{query}%'
+    results = base_query.filter(or_(*[column.ilike(pattern) for column in columns]))
+    if dialect == 'postgresql':
+        results = results.order_by(func.greatest(*[func.similarity(column, query) for column in columns]).desc())
+    results = results.order_by(model.name, model.id).offset(offset).limit(per_page + 1).all()
+    return SearchPage(results[:per_page], page, per_page, len(results) > per_page)
+
+def search_patients(query, page=1, per_page=20):
+    """Patients matching query in name, email or contact, best matches first"""
+    return _page(Patient, query, [Patient.name, Patient.email, Patient.contact],
+                 'patient_search', '10.0, 5.0, 1.0', page, per_page, Patient.query)
+
+def search_doctors(query, page=1, per_page=20):
+    """Doctors matching query in name, email or department name, best matches first"""
+    base_query = Doctor.query.join(Department).options(contains_eager(Doctor.department_rel))
+    return _page(Doctor, query, [Doctor.name, Doctor.email, Department.department_name],
+                 'doctor_search', '10.0, 5.0, 3.0', page, per_page, base_query)
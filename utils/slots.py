@@ -0,0 +1,111 @@
+"""
+Free-slot engine
+Expands doctors' weekly DoctorAvailability into fixed-length slots and
+subtracts the non-cancelled appointments in a date range. The expansion is
+stored per doctor and day by utils/schedule.py, which lookups read from.
+"""
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+from flask import current_app
+from sqlalchemy import select
+from extensions import db
+from models.doctor_availability import DoctorAvailability
+
+def slot_minutes():
+    """Configured appointment length in minutes"""
+    return current_app.config.get('APPOINTMENT_SLOT_MINUTES', 60)
+
+def generate_slots(availability, minutes=None):
+    """Start times of every slot that fits entirely inside one availability window"""
+    minutes = minutes or slot_minutes()
+    step = timedelta(minutes=minutes)
+    day = datetime.min.date()
+    current = datetime.combine(day, availability.start_time)
+    end = datetime.combine(day, availability.end_time)
+
+    slots = []
+    while current + step <= end:
+        slots.append(current.time())
+        current += step
+    return slots
+
+def free_slots_for_doctors(doctor_ids, start_date, end_date):
+    """
+    Free slots for several doctors between start_date and end_date (inclusive)
+    Returns {doctor_id: {date: [time, ...]}}, only listing dates with free slots.
+    Reads the materialised schedule (utils/schedule.py), computing days outside it live.
+    """
+    from utils.schedule import parse_slots, schedule_days
+
+    now = datetime.now()
+    result = {}
+    for doctor_id, days in schedule_days(doctor_ids, start_date, end_date).items():
+        result[doctor_id] = {}
+        for day, row in sorted(days.items()):
+            if not row['free']:
+                continue
+            free = [slot for slot in parse_slots(row['free_slots']) if datetime.combine(day, slot) > now]
+            if free:
+                result[doctor_id][day] = free
+    return result
+
+def free_slots(doctor_id, start_date, end_date):
+    """Free slots for one doctor, {date: [time, ...]}"""
+    return free_slots_for_doctors([doctor_id], start_date, end_date)[doctor_id]
+
+class _ScheduleBlocks:
+    """Schedule rows for a set of doctors, read a block of days at a time as the streams reach it"""
+
+    def __init__(self, doctor_ids, start_date, end_date, block_days):
+        self.doctor_ids = doctor_ids
+        self.start_date = start_date
+        self.end_date = end_date
+        self.block_days = block_days
+        self.blocks = {}
+
+    def day(self, doctor_id, day):
+        from utils.schedule import schedule_days
+
+        block = (day - self.start_date).days // self.block_days
+        if block not in self.blocks:
+            first = self.start_date + timedelta(days=block * self.block_days)
+            last = min(self.end_date, first + timedelta(days=self.block_days - 1))
+            self.blocks[block] = schedule_days(self.doctor_ids, first, last)
+        return self.blocks[block][doctor_id][day]
+
+def _free_slot_stream(doctor_id, blocks, now):
+    """A doctor's free slots in time order, as (datetime, doctor_id)"""
+    from utils.schedule import parse_slots
+
+    day = blocks.start_date
+    while day <= blocks.end_date:
+        row = blocks.day(doctor_id, day)
+        if row['free']:
+            for slot in parse_slots(row['free_slots']):
+                moment = datetime.combine(day, slot)
+                if moment > now:
+                    yield moment, doctor_id
+        day += timedelta(days=1)
+
+def earliest_free_slots(doctor_ids, start_date, end_date, limit, block_days=7):
+    """
+    The `limit` soonest free slots across several doctors, as [(datetime, doctor_id), ...]
+    Each doctor's free slots form a time-ordered stream; heapq.merge pulls from
+    them lazily, so schedule days are only read block by block until `limit`
+    slots are found rather than for every doctor's whole window. Ties go to
+    the lower doctor id.
+    """
+    if end_date < start_date or limit < 1:
+        return []
+    # A doctor without weekly availability would read the whole window to yield nothing
+    doctor_ids = db.session.execute(
+        select(DoctorAvailability.doctor_id).where(DoctorAvailability.doctor_id.in_(list(doctor_ids)))
+        .distinct().order_by(DoctorAvailability.doctor_id)
+    ).scalars().all()
+    if not doctor_ids:
+        return []
+    blocks = _ScheduleBlocks(doctor_ids, start_date, end_date, block_days)
+    now = datetime.now()
+    streams = [_free_slot_stream(doctor_id, blocks, now) for doctor_id in doctor_ids]
+    return list(islice(heapq.merge(*streams), limit))
@@ -0,0 +1,127 @@
+"""
+Local SMTP stand-in
+Accepts mail on localhost and keeps it in memory instead of delivering it,
+for exercising the outbox without a real SMTP server.
+
+Usage:
+    python -m utils.smtp_sink --port 1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=False python app.py
+"""
+import argparse
+import socketserver
+import threading
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        sink = self.server.sink
+        mail_from, rcpt_to = None, []
+        self.reply('220 localhost SMTP sink ready')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+
+            if sink.fail_next:
+                sink.fail_next -= 1
+                self.reply('451 Temporary failure')
+            elif verb == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif verb == 'HELO':
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command.split(':', 1)[1].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_to.append(command.split(':', 1)[1].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for raw in self.rfile:
+                    if raw in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(raw[1:] if raw.startswith(b'..') else raw)
+                sink.received(mail_from, rcpt_to, b''.join(data).decode(errors='replace'))
+                mail_from, rcpt_to = None, []
+                self.reply('250 OK: queued')
+            elif verb == 'RSET':
+                mail_from, rcpt_to = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class SMTPSink:
+    """
+    In-memory SMTP server running in a background thread
+    Usage:
+        with SMTPSink() as sink:
+            app.config.update(MAIL_SERVER='localhost', MAIL_PORT=sink.port, MAIL_USE_TLS=False)
+            ...
+            assert sink.messages
+    Set fail_next to make the next N commands fail with a 451 reply.
+    """
+
+    def __init__(self, host='localhost', port=0, verbose=False):
+        self.messages = []
+        self.fail_next = 0
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def received(self, mail_from, rcpt_to, data):
+        with self._lock:
+            self.messages.append((mail_from, rcpt_to, data))
+        if self.verbose:
+            print(f'--- From {mail_from} to {", ".join(rcpt_to)}\n{data}')
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local SMTP stand-in that prints received mail')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1025)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, verbose=True)
+    print(f'SMTP sink listening on {args.host}:{sink.port}')
+    try:
+        sink._server.serve_forever()
+    except KeyboardInterrupt:
+        sink.stop()
@@ -0,0 +1,86 @@
+"""
+Dashboard statistics service
+Each dashboard's counters come from one aggregate query and are cached per
+role and user for STATS_CACHE_TTL seconds. A doctor's daily counts are read
+from the schedule rows the dashboard already loaded, so only the pending
+count is queried and cached.
+"""
+from datetime import datetime
+from sqlalchemy import case, func, select
+from config import Config
+from extensions import db
+from models.appointment import Appointment
+from models.department import Department
+from models.doctor import Doctor
+from models.patient import Patient
+from utils.cache import TTLCache
+
+_cache = TTLCache(ttl=Config.STATS_CACHE_TTL, maxsize=Config.STATS_CACHE_SIZE)
+
+def _count_if(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END), portable across backends"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def _scalar_count(model, *criteria):
+    """Scalar subquery counting rows of model"""
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+def _admin_stats():
+    row = db.session.execute(
+        select(
+            _scalar_count(Doctor).label('doctors'),
+            _scalar_count(Patient).label('patients'),
+            func.count(Appointment.id).label('appointments'),
+            _count_if(Appointment.status == 'Booked').label('pending')
+        ).select_from(Appointment)
+    ).one()
+    return dict(row._mapping)
+
+def _doctor_pending(doctor_id):
+    return db.session.execute(
+        select(func.count()).select_from(Appointment).where(
+            Appointment.doctor_id == doctor_id, Appointment.status == 'Booked'
+        )
+    ).scalar()
+
+def _patient_stats(patient_id, today):
+    row = db.session.execute(
+        select(
+            _count_if(Appointment.date >= today).label('upcoming'),
+            _scalar_count(Doctor, Doctor.is_blacklisted == False).label('total_doctors'),
+            _scalar_count(Department).label('departments')
+        ).where(Appointment.patient_id == patient_id)
+    ).one()
+    return dict(row._mapping)
+
+def get_admin_stats():
+    """Doctor, patient, appointment and pending counts for the admin dashboard"""
+    return _cache.get_or_set(('admin', None), _admin_stats)
+
+def get_doctor_stats(doctor_id, days):
+    """
+    Today, next 7 days and pending appointment counts for a doctor
+    days are the doctor's schedule rows {date: row} from today to a week ahead.
+    """
+    today = datetime.now().date()
+    totals = {day: row['booked'] + row['completed'] + row['cancelled'] for day, row in days.items()}
+    pending = _cache.get_or_set(('doctor', doctor_id, today), lambda: _doctor_pending(doctor_id))
+    return {'today': totals.pop(today, 0), 'upcoming': sum(totals.values()), 'pending': pending}
+
+def get_patient_stats(patient_id):
+    """Upcoming appointments, active doctors and department counts for a patient"""
+    today = datetime.now().date()
+    return _cache.get_or_set(('patient', patient_id, today), lambda: _patient_stats(patient_id, today))
+
+def invalidate_stats(role=None, user_id=None):
+    """
+    Drop cached statistics
+    No arguments clears everything, a role alone clears every user of that role.
+    """
+    _cache.clear(lambda key: (role is None or key[0] == role) and (user_id is None or key[1] == user_id))
+
+def invalidate_appointment_stats(appointment):
+    """Drop the statistics affected by booking, cancelling or completing an appointment"""
+    invalidate_stats('admin')
+    invalidate_stats('doctor', appointment.doctor_id)
+    invalidate_stats('patient', appointment.patient_id)
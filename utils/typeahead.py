@@ -0,0 +1,238 @@
+"""
+Typeahead suggestions for patients and doctors
+Each process keeps a compact sorted list of lowercase search terms (full
+names, name words, emails, department names) and answers prefix queries
+with a binary search. Committed inserts, edits, blacklisting and deletes are
+applied incrementally; a periodic full rebuild picks up writes made by other
+processes. One request runs it while the others keep answering from the
+current index.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from config import Config
+from extensions import db
+from models.department import Department
+from models.doctor import Doctor
+from models.patient import Patient
+
+# Separates a term from its record id inside an index key
+_SEP = '\x00'
+
+# Matching keys examined per requested suggestion, bounds work for one-letter queries
+_SCAN_FACTOR = 20
+
+class PrefixIndex:
+    """
+    Sorted 'term\\0id' keys over a set of records, searched by prefix
+    Records are stored as (name, email, department, blacklisted) tuples and
+    only turned into dicts for the results returned.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._records = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _terms(record):
+        """Lowercase terms a record can be found by"""
+        name, email, department, _ = record
+        name = (name or '').lower()
+        terms = {name, (email or '').lower(), (department or '').lower()}
+        terms.update(word for word in name.split()[1:] if len(word) > 1)
+        terms.discard('')
+        return terms
+
+    def _remove(self, record_id):
+        record = self._records.pop(record_id, None)
+        if record is None:
+            return
+        for term in self._terms(record):
+            key = f'{term}{_SEP}{record_id}'
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def add(self, record_id, name, email, department=None, blacklisted=False):
+        """Insert or replace a record"""
+        record = (name, email, department, bool(blacklisted))
+        with self._lock:
+            self._remove(record_id)
+            self._records[record_id] = record
+            for term in self._terms(record):
+                insort(self._keys, f'{term}{_SEP}{record_id}')
+
+    def remove(self, record_id):
+        with self._lock:
+            self._remove(record_id)
+
+    def load(self, rows):
+        """Replace the whole index from (id, name, email, department, blacklisted) rows, sorting once"""
+        keys, records = [], {}
+        for record_id, name, email, department, blacklisted in rows:
+            record = records[record_id] = (name, email, department, bool(blacklisted))
+            keys.extend(f'{term}{_SEP}{record_id}' for term in self._terms(record))
+        keys.sort()
+        with self._lock:
+            self._keys, self._records = keys, records
+
+    def search(self, prefix, limit, include_blacklisted=True):
+        """
+        Up to limit records with a term starting with prefix, as dicts
+        Records whose name starts with the prefix come first, then by name.
+        """
+        prefix = prefix.lower()
+        found = {}
+        with self._lock:
+            i = bisect_left(self._keys, prefix)
+            end = min(len(self._keys), i + limit * _SCAN_FACTOR)
+            while i < end and self._keys[i].startswith(prefix):
+                record_id = int(self._keys[i].rsplit(_SEP, 1)[1])
+                record = self._records[record_id]
+                if include_blacklisted or not record[3]:
+                    found[record_id] = record
+                i += 1
+
+        ranked = sorted(found.items(),
+                        key=lambda item: (not item[1][0].lower().startswith(prefix), item[1][0].lower(), item[0]))
+        return [{'id': record_id, 'name': name, 'email': email, 'department': department, 'blacklisted': blacklisted}
+                for record_id, (name, email, department, blacklisted) in ranked[:limit]]
+
+    def __len__(self):
+        return len(self._records)
+
+# {kind: PrefixIndex}, None until first built; rebuilds swap in a new dict
+_indexes = None
+_built_at = None
+_build_lock = threading.Lock()
+# Guards the swap against commit hooks; _replay collects changes committed during a rebuild
+_pending_lock = threading.Lock()
+_replay = None
+
+def _apply(indexes, changes):
+    for kind, record_id, record in changes:
+        if record is None:
+            indexes[kind].remove(record_id)
+        else:
+            indexes[kind].add(record_id, *record)
+
+def rebuild():
+    """
+    Reload both indexes from the database (two queries)
+    The new indexes are built aside while the current ones keep serving, and
+    changes committed in this process meanwhile are replayed onto them before
+    they are swapped in.
+    """
+    global _indexes, _built_at, _replay
+    with _pending_lock:
+        _replay = []
+    try:
+        primary = {'bind': db.engine}
+        indexes = {'patient': PrefixIndex(), 'doctor': PrefixIndex()}
+        indexes['patient'].load(db.session.execute(db.select(
+            Patient.id, Patient.name, Patient.email, db.null(), Patient.is_blacklisted
+        ).execution_options(yield_per=10000), bind_arguments=primary))
+        indexes['doctor'].load(db.session.execute(db.select(
+            Doctor.id, Doctor.name, Doctor.email, Department.department_name, Doctor.is_blacklisted
+        ).outerjoin(Department), bind_arguments=primary))
+        with _pending_lock:
+            _apply(indexes, _replay)
+            _indexes = indexes
+            _built_at = time.monotonic()
+    finally:
+        with _pending_lock:
+            _replay = None
+
+def _stale():
+    return _built_at is None or time.monotonic() - _built_at >= Config.TYPEAHEAD_REBUILD_INTERVAL
+
+def _ensure_built():
+    if not _stale():
+        return
+    if _indexes is None:
+        # Nothing to serve yet, wait for the first build
+        with _build_lock:
+            if _indexes is None:
+                rebuild()
+        return
+    # One request rebuilds, the others keep answering from the current indexes
+    if _build_lock.acquire(blocking=False):
+        try:
+            if _stale():
+                rebuild()
+        finally:
+            _build_lock.release()
+
+def suggest(kind, prefix, limit, include_blacklisted=False):
+    """Top prefix matches of one kind ('patient' or 'doctor') as plain dicts"""
+    prefix = prefix.strip()
+    if not prefix:
+        return []
+    _ensure_built()
+    return _indexes[kind].search(prefix, limit, include_blacklisted)
+
+def get_limit():
+    """Suggestion count from ?limit=, clamped to TYPEAHEAD_MAX_LIMIT"""
+    limit = request.args.get('limit', current_app.config['TYPEAHEAD_LIMIT'], type=int)
+    return max(1, min(limit, current_app.config['TYPEAHEAD_MAX_LIMIT']))
+
+def invalidate():
+    """Force a full rebuild on next use, serving the current index meanwhile"""
+    global _built_at
+    _built_at = None
+
+# Incremental maintenance: collect changes during flush, apply them once committed
+
+def _pending(target):
+    session = object_session(target)
+    return session.info.setdefault('typeahead_pending', []) if session is not None else None
+
+def _patient_changed(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending.append(('patient', target.id, (target.name, target.email, None, target.is_blacklisted)))
+
+def _doctor_changed(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        department = connection.execute(
+            db.select(Department.department_name).where(Department.id == target.specialization_id)
+        ).scalar()
+        pending.append(('doctor', target.id, (target.name, target.email, department, target.is_blacklisted)))
+
+def _deleted(kind):
+    def listener(mapper, connection, target):
+        pending = _pending(target)
+        if pending is not None:
+            pending.append((kind, target.id, None))
+    return listener
+
+for _event in ('after_insert', 'after_update'):
+    event.listen(Patient, _event, _patient_changed)
+    event.listen(Doctor, _event, _doctor_changed)
+event.listen(Patient, 'after_delete', _deleted('patient'))
+event.listen(Doctor, 'after_delete', _deleted('doctor'))
+
+@event.listens_for(Department, 'after_update')
+def _department_renamed(mapper, connection, target):
+    # Every doctor in the department carries its name, rebuild rather than track them
+    invalidate()
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    pending = session.info.pop('typeahead_pending', None)
+    if not pending:
+        return
+    with _pending_lock:
+        if _indexes is not None:
+            _apply(_indexes, pending)
+        if _replay is not None:
+            _replay.extend(pending)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('typeahead_pending', None)